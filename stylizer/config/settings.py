@@ -125,3 +125,172 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Loaded style transfer models kept resident per process (see style_engine/registry.py)
+# MAX_BYTES / IDLE_TTL (seconds) may be None to disable that limit
+MODEL_REGISTRY = {
+    'MAX_ENTRIES': 8,
+    'MAX_BYTES': 1024 * 1024 * 1024,
+    'IDLE_TTL': 30 * 60,
+}
+
+# Models preloaded (and run once per resolution) when a server process starts.
+# Readiness is reported at /healthz/ until warm-up has finished.
+WARMUP = {
+    'ENABLED': True,
+    'JOHNSON_STYLES': ['candy', 'mosaic', 'starry'],
+    'RESOLUTIONS': [(1024, 768), (1024, 576)],
+}
+
+# Micro-batching of concurrent Johnson requests that share a style and input shape.
+# MAX_WAIT (seconds) is how long the first request waits for others to join its batch.
+JOHNSON_BATCHING = {
+    'ENABLED': True,
+    'MAX_BATCH_SIZE': 4,
+    'MAX_WAIT': 0.02,
+}
+
+# Serve Johnson presets from one shared network with per-style InstanceNorm parameters.
+# Build the bank with: python -m style_engine.tools.build_style_bank (distills every style into the shared
+# body; styles that still differ from their own checkpoint are left out and keep using it).
+JOHNSON_STYLE_BANK = {
+    'ENABLED': False,
+    'PATH': BASE_DIR / 'style_engine' / 'backends' / 'weights' / 'johnson_bank.pt',
+}
+
+# Linear style features cached by style image hash (the hash is the style id returned by /styles/).
+# SPILL_DIR keeps features on disk as well, so style ids survive eviction, restarts and other workers.
+STYLE_FEATURE_CACHE = {
+    'MAX_ENTRIES': 256,
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'SPILL_DIR': BASE_DIR / 'cache' / 'style_features',
+    'MAX_SPILL_ENTRIES': 10000,
+}
+
+# Linear content features cached by content image hash and target width (memory only by default)
+CONTENT_FEATURE_CACHE = {
+    'MAX_ENTRIES': 32,
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'SPILL_DIR': None,
+    'MAX_SPILL_ENTRIES': None,
+}
+
+# Tiled high-resolution mode (POST tiled=1 to /stylize/): output keeps the original width
+# (or the requested `width`), up to MAX_WIDTH. Peak memory follows TILE, not the image size.
+TILING = {
+    'TILE': 512,
+    'OVERLAP': 64,
+    'MAX_WIDTH': 8192,
+}
+
+# Progressive mode (POST progressive=1 to /stylize/): a preview at PREVIEW_WIDTH is streamed
+# as a Server-Sent Event before the full-resolution result
+PROGRESSIVE = {
+    'PREVIEW_WIDTH': 256,
+}
+
+# Background stylization jobs (/jobs/). BACKEND is any transfer.jobs.JobQueue subclass;
+# the SQLite queue needs no external service and survives restarts.
+# LEASE (seconds) is how long a job may run before another worker takes it over.
+JOBS = {
+    'BACKEND': 'transfer.jobs.SQLiteJobQueue',
+    'OPTIONS': {'path': BASE_DIR / 'cache' / 'jobs' / 'queue.sqlite3'},
+    'ROOT': BASE_DIR / 'cache' / 'jobs',
+    'WORKERS': 2,
+    'LEASE': 600,
+    'RETENTION': 24 * 60 * 60,
+}
+
+# Bounded executor used by the async /stylize/ view: PER_MODEL_LIMIT concurrent inferences per model.
+# Johnson models get at least JOHNSON_BATCHING["MAX_BATCH_SIZE"] while batching is on, so batches can fill.
+# TORCH_THREADS caps PyTorch intra-op threads so concurrent inferences do not oversubscribe the CPU.
+INFERENCE_EXECUTOR = {
+    'PER_MODEL_LIMIT': 2,
+    'TORCH_THREADS': None,
+}
+
+# Out-of-process inference: WORKERS processes hold the models and exchange pixels via shared memory.
+# Tiled and progressive requests still run in the web process. A worker that dies is restarted and its
+# requests fail; TIMEOUT (seconds) bounds how long a request waits for its result.
+INFERENCE_POOL = {
+    'ENABLED': False,
+    'WORKERS': 2,
+    'TORCH_THREADS': None,
+    'TIMEOUT': 300,
+}
+
+# Disk cache of encoded /stylize/ results, content-addressed by inputs and engine parameters.
+# Least recently used files are evicted once the directory exceeds MAX_BYTES.
+# The pixels of recent results stay in memory (up to RECENT_MAX_BYTES) so that a lossless download of a
+# result served as WebP/JPEG is encoded on demand, without running the model again.
+RESULT_CACHE = {
+    'ENABLED': True,
+    'ROOT': BASE_DIR / 'cache' / 'results',
+    'MAX_BYTES': 512 * 1024 * 1024,
+    'RECENT_MAX_BYTES': 256 * 1024 * 1024,
+}
+
+# /stylize/ output encoding. DEFAULT_FORMAT applies when neither `format` nor the Accept header picks one.
+# PNG_COMPRESS_LEVEL is zlib's 0-9 (lower is faster), WEBP_METHOD 0-6 trades speed for size.
+OUTPUT_ENCODING = {
+    'DEFAULT_FORMAT': 'png',
+    'PNG_COMPRESS_LEVEL': 3,
+    'WEBP_QUALITY': 85,
+    'WEBP_METHOD': 2,
+    'JPEG_QUALITY': 90,
+    'WORKERS': 4,
+}
+
+# Compiled inference: torch.compile graphs built once per resolution bucket (sides rounded up to a
+# multiple of BUCKET_STEP, inputs padded and outputs cropped) and persisted in CACHE_DIR across restarts.
+# Inputs with a side above MAX_SIDE run eagerly.
+COMPILED_INFERENCE = {
+    'ENABLED': False,
+    'CACHE_DIR': BASE_DIR / 'cache' / 'compiled',
+    'BUCKET_STEP': 128,
+    'MAX_SIDE': 2048,
+}
+
+# ONNX Runtime backend (CPU provider) for Johnson presets and the Linear network. Tiled requests, the
+# style bank and INFERENCE_POOL workers keep using PyTorch. Export the graphs to ROOT with
+# `python -m style_engine.tools.export_onnx`; INTRA_OP_THREADS None lets ONNX Runtime pick.
+# MEMORY_ARENA False roughly halves the Linear peak memory at ~25% higher latency.
+ONNX_RUNTIME = {
+    'ENABLED': False,
+    'ROOT': BASE_DIR / 'style_engine' / 'backends' / 'weights' / 'onnx',
+    'INTRA_OP_THREADS': None,
+    'MEMORY_ARENA': True,
+}
+
+# INT8 Johnson checkpoints (`<style>.int8.pt` beside the fp32 ones, written by
+# `python -m style_engine.tools.quantize_johnson`). ENABLED serves every preset from them; the /stylize/
+# `quantized` field (1 or 0) overrides it per request. INT8 models run on the CPU, outside the inference pool.
+QUANTIZED_INFERENCE = {
+    'ENABLED': False,
+}
+
+# Precision and memory layout of the PyTorch models, applied once at load time: 'fp32', 'channels_last'
+# (NHWC weights and inputs), 'bf16' (bfloat16 autocast, fp32 weights) or 'bf16_channels_last'.
+# Tiled requests run without autocast; INT8, ONNX and INFERENCE_POOL models always use fp32.
+EXECUTION_MODE = {
+    'MODE': 'fp32',
+}
+
+# Preset styles served by the Linear model from precomputed style features (snet matrix and mean of every
+# preset in one file, written by `python -m style_engine.tools.build_linear_presets`). When ENABLED, presets
+# found in PATH run on the resident Linear model instead of their Johnson checkpoints, unless a request
+# asks for `quantized=1`.
+LINEAR_PRESETS = {
+    'ENABLED': False,
+    'PATH': BASE_DIR / 'style_engine' / 'backends' / 'weights' / 'linear_presets.pt',
+}
+
+# Video stylization jobs (POST a `video` to /jobs/video/): frames are decoded lazily, stylized BATCH_SIZE at
+# a time at WIDTH and written straight to an MP4 (FOURCC), so memory stays flat whatever the clip length.
+# MAX_FRAMES (None: no limit) caps the frames stylized per clip.
+VIDEO = {
+    'WIDTH': 1024,
+    'BATCH_SIZE': 4,
+    'FOURCC': 'mp4v',
+    'MAX_FRAMES': None,
+}
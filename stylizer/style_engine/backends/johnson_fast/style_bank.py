@@ -0,0 +1,78 @@
+"""
+    Conditional instance normalization ("style bank") variant of TransformerNet.
+
+    All styles share one set of convolution weights; each style only owns the affine scale/shift of every
+    InstanceNorm2d layer (Dumoulin et al., "A Learned Representation For Artistic Style": https://arxiv.org/abs/1610.07629).
+    Because the style is selected per sample, a batch may mix several styles in a single forward pass.
+"""
+
+import torch
+import torch.nn.functional as F
+
+from .transformer_net import TransformerNet, ResidualBlock
+
+
+class ConditionalInstanceNorm2d(torch.nn.Module):
+    """
+        InstanceNorm2d holding one (weight, bias) pair per style, selected per sample by `style_ids`
+    """
+
+    def __init__(self, num_styles, num_features, eps=1e-5):
+        super().__init__()
+        self.eps = eps
+        self.weight = torch.nn.Parameter(torch.ones(num_styles, num_features))
+        self.bias = torch.nn.Parameter(torch.zeros(num_styles, num_features))
+
+    def forward(self, x, style_ids):
+        out = F.instance_norm(x, eps=self.eps)
+        weight = self.weight[style_ids][:, :, None, None]
+        bias = self.bias[style_ids][:, :, None, None]
+        return out * weight + bias
+
+
+class StyleBankTransformerNet(TransformerNet):
+    """
+        TransformerNet whose InstanceNorm2d layers are replaced by ConditionalInstanceNorm2d
+    """
+
+    def __init__(self, num_styles):
+        super().__init__()
+        self.num_styles = num_styles
+        for parent in [self] + [m for m in self.modules() if isinstance(m, ResidualBlock)]:
+            for name, child in list(parent.named_children()):
+                if isinstance(child, torch.nn.InstanceNorm2d):
+                    setattr(parent, name, ConditionalInstanceNorm2d(num_styles, child.num_features, child.eps))
+
+    def forward(self, x, style_ids):
+        y = self.relu(self.in1(self.conv1(x), style_ids))
+        y = self.relu(self.in2(self.conv2(y), style_ids))
+        y = self.relu(self.in3(self.conv3(y), style_ids))
+        for block in (self.res1, self.res2, self.res3, self.res4, self.res5):
+            residual = y
+            out = block.relu(block.in1(block.conv1(y), style_ids))
+            y = block.in2(block.conv2(out), style_ids) + residual
+        y = self.relu(self.in4(self.up1(y), style_ids))
+        y = self.relu(self.in5(self.up2(y), style_ids))
+        return self.up3(y)
+
+    def load_style(self, style_index, state_dict):
+        """
+            Copies the InstanceNorm2d affine parameters of a regular TransformerNet checkpoint into slot `style_index`
+        """
+        with torch.no_grad():
+            for name, module in self.named_modules():
+                if isinstance(module, ConditionalInstanceNorm2d):
+                    module.weight[style_index].copy_(state_dict[f"{name}.weight"])
+                    module.bias[style_index].copy_(state_dict[f"{name}.bias"])
+
+    def load_body(self, state_dict):
+        """
+            Copies every non-normalization weight (the shared conv body) from a regular TransformerNet checkpoint
+        """
+        norm_names = {name for name, m in self.named_modules() if isinstance(m, ConditionalInstanceNorm2d)}
+        body = {k: v for k, v in state_dict.items() if k.rsplit(".", 1)[0] not in norm_names}
+        missing, _ = self.load_state_dict(body, strict=False)
+        assert all(k.rsplit(".", 1)[0] in norm_names for k in missing), f"Missing body weights: {missing}"
+
+    def norm_parameters(self):
+        return [p for m in self.modules() if isinstance(m, ConditionalInstanceNorm2d) for p in m.parameters()]
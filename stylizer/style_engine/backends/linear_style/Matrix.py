@@ -55,21 +55,13 @@ class MulLayer(nn.Module):
         self.transmatrix = None
 
     def forward(self,cF,sF,trans=True):
-        cFBK = cF.clone()
-        cb,cc,ch,cw = cF.size()
-        cFF = cF.view(cb,cc,-1)
-        cMean = torch.mean(cFF,dim=2,keepdim=True)
-        cMean = cMean.unsqueeze(3)
-        cMean = cMean.expand_as(cF)
+        # Means broadcast over the spatial dims (no expanded copies) and cF is not cloned: the backup
+        # the original kept was never used
+        cMean = torch.mean(cF,dim=(2,3),keepdim=True)
         cF = cF - cMean
 
-        sb,sc,sh,sw = sF.size()
-        sFF = sF.view(sb,sc,-1)
-        sMean = torch.mean(sFF,dim=2,keepdim=True)
-        sMean = sMean.unsqueeze(3)
-        sMeanC = sMean.expand_as(cF)
-        sMeanS = sMean.expand_as(sF)
-        sF = sF - sMeanS
+        sMean = torch.mean(sF,dim=(2,3),keepdim=True)
+        sF = sF - sMean
 
 
         compress_content = self.compress(cF)
@@ -85,7 +77,7 @@ class MulLayer(nn.Module):
             transmatrix = torch.bmm(sMatrix,cMatrix)
             transfeature = torch.bmm(transmatrix,compress_content).view(b,c,h,w)
             out = self.unzip(transfeature.view(b,c,h,w))
-            out = out + sMeanC
+            out = out + sMean
             return out, transmatrix
         else:
             out = self.unzip(compress_content.view(b,c,h,w))
@@ -223,6 +223,43 @@ class encoder4(nn.Module):
 
         return output
 
+    def forward_r41(self,x):
+        # Same layers as forward, but only r41 is returned. Each activation is released as soon as the next
+        # layer has produced its output (one statement per layer, ReLUs in place), instead of every
+        # intermediate staying alive in the output dict until the end
+        out = self.conv1(x)
+        out = self.reflecPad1(out)
+        out = self.conv2(out)
+        out = self.relu2(out)
+        out = self.reflecPad7(out)
+        out = self.conv3(out)
+        out = self.relu3(out)
+        out = self.maxPool(out)
+        out = self.reflecPad4(out)
+        out = self.conv4(out)
+        out = self.relu4(out)
+        out = self.reflecPad7(out)
+        out = self.conv5(out)
+        out = self.relu5(out)
+        out = self.maxPool2(out)
+        out = self.reflecPad6(out)
+        out = self.conv6(out)
+        out = self.relu6(out)
+        out = self.reflecPad7(out)
+        out = self.conv7(out)
+        out = self.relu7(out)
+        out = self.reflecPad8(out)
+        out = self.conv8(out)
+        out = self.relu8(out)
+        out = self.reflecPad9(out)
+        out = self.conv9(out)
+        out = self.relu9(out)
+        out = self.maxPool3(out)
+        out = self.reflecPad10(out)
+        out = self.conv10(out)
+        out = self.relu10(out)
+        return out
+
 class decoder4(nn.Module):
     def __init__(self):
         super(decoder4,self).__init__()
@@ -1,17 +1,31 @@
 from abc import ABC, abstractmethod
-import cv2 as cv
-import numpy as np
 import torch
+import PIL.Image
 from PIL.Image import Image
 
+from .ingest import resize_to_width
+
 NEW_WIDTH = 1024  # Resize images to this size
 
+# "channels_last": conv weights and inputs in NHWC layout; "bf16": networks run under bfloat16 autocast
+EXECUTION_MODES = ("fp32", "channels_last", "bf16", "bf16_channels_last")
+
 
 class BaseStyleTransferModel(ABC):
     """
     Base class inherited by Johnson and Linear models
     """
 
+    # Per-channel statistics the network output is normalized with (None: output already in [0, 1])
+    output_mean = None
+    output_std = None
+    execution_mode = "fp32"
+
+    # Capabilities callers check before dispatching: `compile` (bucketed torch.compile graphs) and
+    # `stylize_tiled` (tile-by-tile inference at full resolution)
+    supports_compile = False
+    supports_tiling = False
+
     def __init__(self, device="cuda"):
         self.device = device
         self.model = None
@@ -33,15 +47,46 @@ class BaseStyleTransferModel(ABC):
 
         return wrapper
 
-    def resize_img(self, image: Image):
+    def resize_img(self, image: Image, width: int = NEW_WIDTH):
+        """
+        Resizes image such that new width = `width` (NEW_WIDTH by default), and retains original ratio.
+        Returns an (H, W, 3) uint8 array; shrinking uses area interpolation, enlarging cubic.
+        """
+        return resize_to_width(image, width)
+
+    def set_execution_mode(self, mode: str):
+        """
+        Switches the loaded model to one of EXECUTION_MODES. Weights are converted to channels-last once,
+        here; `prepare_input` does the same for every input. bf16 keeps fp32 weights and runs the forward
+        passes under autocast (see `autocast`), outputs are returned in fp32.
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {mode} (expected one of {', '.join(EXECUTION_MODES)})")
+        self.execution_mode = mode
+        if self.channels_last:
+            for module in self.conv_modules():
+                module.to(memory_format=torch.channels_last)
+        return self
+
+    @property
+    def channels_last(self) -> bool:
+        return self.execution_mode.endswith("channels_last")
+
+    def conv_modules(self) -> list[torch.nn.Module]:
+        """
+        Returns the modules converted to channels-last (those that only run convolutions on images)
+        """
+        return self.modules()
+
+    def prepare_input(self, tensor: torch.Tensor) -> torch.Tensor:
+        return tensor.contiguous(memory_format=torch.channels_last) if self.channels_last else tensor
+
+    def autocast(self):
         """
-        Resizes image such that new width = NEW_WIDTH, and retains original ratio
+        Context for forward passes: bfloat16 autocast in the bf16 modes, a no-op otherwise
         """
-        img = np.array(image)
-        current_height, current_width = img.shape[:2]
-        new_height = int(current_height * (NEW_WIDTH / current_width))
-        img = cv.resize(img, (NEW_WIDTH, new_height), interpolation=cv.INTER_CUBIC)
-        return img
+        device_type = torch.device(self.device).type
+        return torch.autocast(device_type, dtype=torch.bfloat16, enabled=self.execution_mode.startswith("bf16"))
 
     @abstractmethod
     def load_model(self, model_path):
@@ -55,11 +100,51 @@ class BaseStyleTransferModel(ABC):
     def stylize(self, content_img, style_img) -> Image:
         pass
 
-    def postprocess(self, tensor):
-        return tensor.cpu().clamp(0, 1)
+    def to_uint8(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Converts a (3, H, W) or (1, 3, H, W) network output into a contiguous (H, W, 3) uint8 tensor on the
+        same device. De-normalizing, scaling to [0, 255] and the CHW -> HWC transpose are fused into one
+        multiply-add in the output's dtype; clamping happens in place, so only the float result and the
+        uint8 frame are allocated.
+        """
+        tensor = tensor.detach()
+        if tensor.dim() == 4:
+            tensor = tensor[0]
+        mean = torch.as_tensor(0.0 if self.output_mean is None else self.output_mean)
+        std = torch.as_tensor(1.0 if self.output_std is None else self.output_std)
+        scale = (255 * std).to(tensor.device, tensor.dtype)
+        shift = (255 * mean).to(tensor.device, tensor.dtype)
+
+        height, width = tensor.shape[1:]
+        out = torch.empty((height, width, 3), dtype=tensor.dtype, device=tensor.device)
+        torch.addcmul(shift, tensor.permute(1, 2, 0), scale, out=out)  # strided read, contiguous HWC write
+        return out.clamp_(0, 255).to(torch.uint8)
+
+    def postprocess(self, tensor: torch.Tensor) -> Image:
+        """
+        Converts a network output into an RGB image. Only the uint8 frame leaves the device; it is already
+        contiguous HWC, so PIL unpacks it directly without numpy-side copies or transposes.
+        """
+        return PIL.Image.fromarray(self.to_uint8(tensor).cpu().numpy())
+
+    def modules(self) -> list[torch.nn.Module]:
+        """
+        Returns every torch module held by this model (overridden by multi-network backends)
+        """
+        return [self.model] if self.model is not None else []
+
+    def memory_footprint(self) -> int:
+        """
+        Returns the number of bytes held by parameters and buffers of all loaded modules
+        """
+        total = 0
+        for module in self.modules():
+            for tensor in list(module.parameters()) + list(module.buffers()):
+                total += tensor.numel() * tensor.element_size()
+        return total
 
     def to(self, device):
         self.device = device
-        if self.model:
-            self.model.to(device)
+        for module in self.modules():
+            module.to(device)
         return self
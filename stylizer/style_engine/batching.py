@@ -0,0 +1,78 @@
+import threading
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.closed = threading.Event()  # set once the batch is full
+        self.done = threading.Event()  # set once results (or an error) are available
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests sharing a key (e.g. style + input shape) into a single batch.
+
+    The first caller for a key becomes the batch leader: it waits up to `max_wait` seconds (or until
+    `max_batch_size` items have joined), runs `run_batch(key, items)` once for everyone, and each
+    caller receives the result at its own index. No background thread is needed.
+    """
+
+    def __init__(self, run_batch, max_batch_size=4, max_wait=0.01):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._open = dict()  # key -> batch still accepting items
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, key, item):
+        """
+        Adds `item` to the open batch for `key` and blocks until its result is ready
+        """
+        with self._lock:
+            batch = self._open.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = _Batch()
+                self._open[key] = batch
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch_size:
+                self._close(key, batch)
+
+        if is_leader:
+            batch.closed.wait(self.max_wait)
+            with self._lock:
+                self._close(key, batch)
+                self.batches += 1
+                self.items += len(batch.items)
+            try:
+                batch.results = self.run_batch(key, batch.items)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _close(self, key, batch):
+        """Stops `batch` from accepting new items (caller holds the lock)"""
+        if self._open.get(key) is batch:
+            del self._open[key]
+        batch.closed.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            }
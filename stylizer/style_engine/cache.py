@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and/or total size, with optional idle TTL.
+
+    `sizeof` maps a value to its size in bytes (only needed when `max_bytes` is set).
+    `on_evict(key, value)` is called for every entry dropped by the budget or the TTL.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=None, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 0)
+        self.on_evict = on_evict
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> (value, size, last_used)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, _ = entry
+            self._entries[key] = (value, size, time.monotonic())
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            self._expire()
+            self._enforce_budget(keep=key)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self, key):
+        value, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def _expire(self):
+        """Drops entries that have not been used within `ttl` seconds"""
+        if not self.ttl:
+            return
+        deadline = time.monotonic() - self.ttl
+        for key in [k for k, (_, _, used) in self._entries.items() if used < deadline]:
+            self._evict(key)
+
+    def _enforce_budget(self, keep=None):
+        """Evicts least recently used entries until both budgets are met (never evicts `keep`)"""
+
+        def over_budget():
+            too_many = self.max_entries is not None and len(self._entries) > self.max_entries
+            too_big = self.max_bytes is not None and self._bytes > self.max_bytes
+            return too_many or too_big
+
+        while over_budget():
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            self._evict(victim)
@@ -0,0 +1,89 @@
+"""
+Compiled execution (torch.compile) with resolution bucketing.
+
+Graphs are compiled for static shapes, one per input shape bucket: height and width are rounded up to a
+multiple of `step`, the input is reflect-padded to the bucket, and the output is cropped back to the size
+the eager module would have produced. Every image of a given aspect ratio range lands in the same
+bucket, so a handful of graphs serve all traffic instead of a recompile for every image height.
+
+Parameters are graph inputs, so modules of the same architecture (e.g. every Johnson style) share graphs.
+Compiled artifacts go to Inductor's on-disk caches under `cache_dir`, so a restarted process (or another
+worker) only re-traces and loads them instead of compiling again.
+"""
+
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+import torch
+import torch._dynamo
+import torch._inductor.config
+import torch.nn.functional as F
+
+MAX_BUCKETS = 64  # Dynamo recompile limit per module class: buckets beyond it would silently run eagerly
+
+
+def configure_cache(cache_dir):
+    """Points Inductor's persistent caches (FX graphs, compiled kernels) at `cache_dir`"""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(cache_dir))
+    torch._inductor.config.fx_graph_cache = True
+    torch._dynamo.config.recompile_limit = max(torch._dynamo.config.recompile_limit, MAX_BUCKETS)
+
+
+class CompiledModule:
+    """
+    Callable running `module` (a module or a module's method) compiled per shape bucket. `output_size(h, w)`
+    gives the eager output size for an (h, w) input; inputs beyond `max_side` fall back to eager execution.
+    """
+
+    def __init__(self, module: Callable[[torch.Tensor], torch.Tensor], cache_dir, output_size, step=128, max_side=2048):
+        configure_cache(cache_dir)
+        self.module = module
+        self.output_size = output_size
+        self.step = step
+        self.max_side = max_side
+        self.compiled = torch.compile(module, dynamic=False)
+        self._shapes = set()
+        self._lock = threading.Lock()
+
+    def bucket(self, height: int, width: int) -> tuple[int, int]:
+        return math.ceil(height / self.step) * self.step, math.ceil(width / self.step) * self.step
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        n, c, height, width = x.shape
+        bucket_h, bucket_w = self.bucket(height, width)
+        if max(bucket_h, bucket_w) > self.max_side:
+            return self.module(x)
+
+        pad_h, pad_w = bucket_h - height, bucket_w - width
+        if pad_h or pad_w:
+            # Reflection needs the padding to be smaller than the input; tiny inputs are replicated instead
+            mode = "reflect" if pad_h < height and pad_w < width else "replicate"
+            x = F.pad(x, (0, pad_w, 0, pad_h), mode=mode)
+
+        out_h, out_w = self.output_size(height, width)
+        channels_last = not x.is_contiguous() and x.is_contiguous(memory_format=torch.channels_last)
+        memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        return self.graph(x.shape, x.dtype, x.device, memory_format)(x)[..., :out_h, :out_w]
+
+    def graph(self, shape, dtype=torch.float32, device="cpu", memory_format=torch.contiguous_format):
+        """
+        Returns the compiled module after making sure the graph for `shape` exists. The first call per
+        shape compiles (or loads from the disk cache) under a lock, so concurrent requests never compile
+        the same bucket twice.
+        """
+        key = (tuple(shape), dtype, str(device), memory_format)
+        if key in self._shapes:
+            return self.compiled
+        with self._lock:
+            if key not in self._shapes:
+                with torch.no_grad():
+                    self.compiled(torch.zeros(shape, dtype=dtype, device=device).contiguous(memory_format=memory_format))
+                self._shapes.add(key)
+        return self.compiled
+
+    def stats(self) -> dict:
+        return {"buckets": sorted("x".join(str(d) for d in key[0]) for key in self._shapes)}
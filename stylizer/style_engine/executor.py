@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceExecutor:
+    """
+    Runs blocking inference off the event loop with bounded parallelism per model.
+
+    Every model key gets its own thread pool of `per_model_limit` threads, so a burst of requests for
+    one model queues up instead of oversubscribing the CPU, while other models keep their own slots.
+    `limits` overrides the limit per model kind (the key's first element). Callers awaiting `run` hold
+    no thread while they wait.
+    """
+
+    def __init__(self, per_model_limit=1, limits: dict | None = None):
+        self.per_model_limit = per_model_limit
+        self.limits = dict(limits or {})
+        self._pools = dict()
+        self._lock = threading.Lock()
+        self._pending = dict()
+
+    def _pool(self, key) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                limit = self.limits.get(key[0], self.per_model_limit)
+                pool = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"inference-{key[0]}")
+                self._pools[key] = pool
+            return pool
+
+    async def run(self, key: tuple, fn, *args, **kwargs):
+        """
+        Awaits `fn(*args, **kwargs)` executed on the pool reserved for `key`
+        """
+        loop = asyncio.get_running_loop()
+        self._track(key, 1)
+        try:
+            return await loop.run_in_executor(self._pool(key), lambda: fn(*args, **kwargs))
+        finally:
+            self._track(key, -1)
+
+    def _track(self, key, delta):
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + delta
+
+    def stats(self) -> dict:
+        """Requests running or waiting, per model key"""
+        with self._lock:
+            return {"/".join(str(k) for k in key if k is not None): n for key, n in self._pending.items()}
@@ -0,0 +1,119 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL.Image import Image
+
+from .cache import LRUCache
+
+
+def image_digest(image: Image) -> str:
+    """
+    Returns a content hash of the decoded pixels (independent of file format or metadata)
+    """
+    pixels = np.asarray(image)
+    digest = hashlib.sha256(f"{pixels.shape}{pixels.dtype}".encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return digest.hexdigest()
+
+
+def tensors_nbytes(value) -> int:
+    """Size in bytes of every tensor field of a feature dataclass"""
+    return sum(
+        t.numel() * t.element_size()
+        for t in vars(value).values()
+        if isinstance(t, torch.Tensor)
+    )
+
+
+class FeatureCache:
+    """
+    Bounded in-memory LRU of feature dataclasses (fields are tensors), with an optional disk tier.
+
+    When `spill_dir` is set, entries are also written there on insert, so they outlive memory
+    eviction and restarts and are shared by every worker process that uses the same directory.
+    The disk tier keeps at most `max_spill_entries` files, trimmed least recently used first through
+    an in-memory index; the directory is only listed once, at startup.
+    """
+
+    def __init__(self, value_type, max_entries=None, max_bytes=None, spill_dir=None, max_spill_entries=None, device="cpu"):
+        self.value_type = value_type
+        self.device = device
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.max_spill_entries = max_spill_entries
+        self.disk_hits = 0
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes, sizeof=tensors_nbytes)
+        self._spill = None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._spill = self._index_spill()
+
+    def get(self, key: str):
+        value = self._memory.get(key)
+        if value is None and self.spill_dir:
+            value = self._load(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._memory.put(key, value)
+        return value
+
+    def put(self, key: str, value):
+        self._memory.put(key, value)
+        if self.spill_dir:
+            self._save(key, value)
+
+    def __contains__(self, key: str):
+        return key in self._memory or bool(self.spill_dir and self._path(key).exists())
+
+    def stats(self) -> dict:
+        stats = self._memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        if self._spill is not None:
+            spill = self._spill.stats()
+            stats["spill_entries"], stats["spill_bytes"] = spill["entries"], spill["bytes"]
+        return stats
+
+    def _path(self, key: str) -> Path:
+        return self.spill_dir / f"{key}.pt"
+
+    def _index_spill(self) -> LRUCache:
+        """
+        Builds the disk tier's index (key -> file size), oldest files first, from one directory listing.
+        Saves and loads keep it current afterwards; entries it evicts have their file deleted.
+        """
+        index = LRUCache(
+            max_entries=self.max_spill_entries,
+            sizeof=lambda size: size,
+            on_evict=lambda key, _: self._path(key).unlink(missing_ok=True),
+        )
+        entries = []
+        for path in self.spill_dir.glob("*.pt"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # trimmed by another worker
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            index.put(key, size)
+        return index
+
+    def _load(self, key: str):
+        path = self._path(key)
+        try:
+            fields = torch.load(path, map_location=self.device, weights_only=True)
+            os.utime(path)  # other workers index the disk tier by mtime when they start
+            size = path.stat().st_size
+        except (FileNotFoundError, RuntimeError, EOFError):
+            return None
+        self._spill.put(key, size)  # also indexes files saved by other workers
+        return self.value_type(**fields)
+
+    def _save(self, key: str, value):
+        fields = {name: t.detach().cpu() for name, t in vars(value).items()}
+        tmp_path = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        torch.save(fields, tmp_path)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, self._path(key))  # atomic, so other workers never read a partial file
+        self._spill.put(key, size)  # trims the least recently used files beyond max_spill_entries
@@ -3,12 +3,17 @@ This module includes code adapted from external open-source repositories.
 See `README.md` (Acknowledgement section) for full details.
 """
 
+import math
 import torch
 from style_engine.backends.johnson_fast.transformer_net import TransformerNet
-from .base import BaseStyleTransferModel
+from style_engine.backends.johnson_fast.style_bank import StyleBankTransformerNet
+from .base import BaseStyleTransferModel, NEW_WIDTH
+from .compiled import CompiledModule
+from .ingest import image_to_tensor
+from .tiling import downscale, run_tiled, with_global_norm_stats
+from .weights import load_into
 import numpy as np
 from PIL import Image
-import torchvision.transforms as transforms
 
 IMAGENET_MEAN_1 = np.array([0.485, 0.456, 0.406])
 IMAGENET_STD_1 = np.array([0.229, 0.224, 0.225])
@@ -19,40 +24,96 @@ class JohnsonStyleTransferModel(BaseStyleTransferModel):
     Class used for stylization via Johnson FFN, inherits BaseStyleTransferModel
     """
 
+    output_mean = IMAGENET_MEAN_1
+    output_std = IMAGENET_STD_1
+    compiled = None
+    supports_compile = True
+    supports_tiling = True
+
     @BaseStyleTransferModel.safe_load_wrapper
     def load_model(self, model_path):
         self.model = TransformerNet().to(self.device)
-        state = torch.load(model_path, map_location=self.device)
-        self.model.load_state_dict(state["state_dict"], strict=True)
+        load_into(self.model, model_path, self.device, key="state_dict")
         self.model.eval()
 
-    def preprocess(self, image: Image.Image) -> torch.Tensor:
+    def compile(self, cache_dir, step=128, max_side=2048):
+        # Two stride-2 convs followed by two 2x upsamplings: outputs are rounded up to a multiple of 4
+        def output_size(height, width):
+            return 4 * math.ceil(height / 4), 4 * math.ceil(width / 4)
+
+        self.compiled = CompiledModule(self.model, cache_dir, output_size, step, max_side)
+
+    def preprocess(self, image: Image.Image, width: int = NEW_WIDTH) -> torch.Tensor:
         """
         Preprocess image by resizing -> converting to tensor -> normalizing
+        (the last two fused into one pass on the device, see `ingest.image_to_tensor`)
         """
-        img = self.resize_img(image)
-        transform = transforms.Compose(
-            [
-                transforms.ToTensor(),
-                transforms.Normalize(mean=IMAGENET_MEAN_1, std=IMAGENET_STD_1),
-            ]
-        )
+        img = self.resize_img(image, width)
+        return self.prepare_input(image_to_tensor(img, self.device, IMAGENET_MEAN_1, IMAGENET_STD_1))
 
-        img = torch.as_tensor(transform(img))
-        return img.to(self.device).unsqueeze(0)
+    def forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """
+        Runs the network on a preprocessed (N, 3, H, W) batch
+        """
+        with torch.no_grad(), self.autocast():
+            return (self.compiled or self.model)(batch).float()
 
-    def stylize(self, content_img: Image.Image, style_img=None) -> Image.Image:
+    def stylize(self, content_img: Image.Image, style_img=None, width: int = NEW_WIDTH) -> Image.Image:
         """
         Stylizes content image based on selected style, then postprocess by denormalizing -> rescaling to RGB values
         """
-        input_tensor = self.preprocess(content_img)
+        input_tensor = self.preprocess(content_img, width)
+        return self.postprocess(self.forward(input_tensor)[0])
+
+    def stylize_tiled(self, content_img: Image.Image, width=None, tile=512, overlap=64) -> Image.Image:
+        """
+        Stylizes at `width` (default: original width) tile by tile. InstanceNorm statistics are taken
+        from a first pass over the whole image at NEW_WIDTH so that all tiles match.
+        """
+        img = self.resize_img(content_img, width or content_img.width)
+        mean = torch.tensor(IMAGENET_MEAN_1, dtype=torch.float32, device=self.device).view(1, 3, 1, 1)
+        std = torch.tensor(IMAGENET_STD_1, dtype=torch.float32, device=self.device).view(1, 3, 1, 1)
+
+        proxy = downscale(img, NEW_WIDTH).to(self.device)
+        net = with_global_norm_stats(self.model, (proxy - mean) / std)
+
+        def run_tile(x):
+            with torch.no_grad():
+                output = net((x.to(self.device) - mean) / std)
+                return (output * std + mean).clamp(0, 1)
+
+        return Image.fromarray(run_tiled(img, run_tile, tile, overlap))
+
+
+class JohnsonStyleBankModel(JohnsonStyleTransferModel):
+    """
+    Serves every predefined Johnson style from one shared TransformerNet body with per-style
+    InstanceNorm2d parameters (built by `style_engine.tools.build_style_bank`)
+    """
+
+    # The forward pass takes per-sample style ids, which neither the compiled graphs nor tiling pass on
+    supports_compile = False
+    supports_tiling = False
+
+    @BaseStyleTransferModel.safe_load_wrapper
+    def load_model(self, model_path):
+        bank = torch.load(model_path, map_location=self.device, mmap=True, weights_only=True)
+        self.styles = list(bank["styles"])
+        self.style_index = {name: i for i, name in enumerate(self.styles)}
+        self.model = StyleBankTransformerNet(len(self.styles)).to(self.device)
+        self.model.load_state_dict(bank["state_dict"], strict=True)
+        self.model.eval()
+
+    def forward(self, batch: torch.Tensor, style_ids: torch.Tensor) -> torch.Tensor:
+        """
+        Runs the network on a preprocessed (N, 3, H, W) batch, sample i using style `style_ids[i]`
+        """
+        with torch.no_grad(), self.autocast():
+            return self.model(batch, style_ids.to(self.device)).float()
 
-        with torch.no_grad():
-            output = self.model(input_tensor).to("cpu").numpy()[0]
-            mean = IMAGENET_MEAN_1.reshape(-1, 1, 1)
-            std = IMAGENET_STD_1.reshape(-1, 1, 1)
-            output = (output * std) + mean  # de-normalize
-            output = (np.clip(output, 0.0, 1.0) * 255).astype(np.uint8)
-            output = np.moveaxis(output, 0, 2)
+    def style_ids(self, style_names: list[str]) -> torch.Tensor:
+        return torch.tensor([self.style_index[name] for name in style_names], dtype=torch.long)
 
-        return Image.fromarray(output)
+    def stylize(self, content_img: Image.Image, style_name: str, width: int = NEW_WIDTH) -> Image.Image:
+        input_tensor = self.preprocess(content_img, width)
+        return self.postprocess(self.forward(input_tensor, self.style_ids([style_name]))[0])
@@ -3,12 +3,98 @@ This module includes code adapted from external open-source repositories.
 See `README.md` (Acknowledgement section) for full details.
 """
 
+import math
+from dataclasses import dataclass
 from PIL import Image
 import torch
-import torchvision.transforms as transforms
 from style_engine.backends.linear_style.models import encoder4, decoder4
 from style_engine.backends.linear_style.Matrix import MulLayer
-from .base import BaseStyleTransferModel
+from .base import BaseStyleTransferModel, NEW_WIDTH
+from .compiled import CompiledModule
+from .ingest import image_to_tensor
+from .tiling import downscale, run_tiled
+from .weights import load_into
+
+
+@dataclass
+class StyleFeatures:
+    """
+    Style-side products of the Linear network, reusable for any content image
+    """
+
+    mean: torch.Tensor  # (1, C, 1, 1) channel mean of the style's r41 features
+    matrix: torch.Tensor  # (1, matrixSize, matrixSize) output of MulLayer.snet
+
+    @classmethod
+    def blend(cls, styles: list["StyleFeatures"], weights: list[float] | None = None) -> "StyleFeatures":
+        """
+        Mixes styles in transform-matrix space: the weighted sum of their snet matrices and means
+        (weights default to equal and are normalized to sum to 1). The transfer is linear in the style
+        matrix and the style mean, so decoding the blend costs the same as decoding a single style.
+        """
+        if not styles:
+            raise ValueError("No styles to blend")
+        weights = [1.0] * len(styles) if weights is None else [float(w) for w in weights]
+        if len(weights) != len(styles):
+            raise ValueError(f"Got {len(weights)} weights for {len(styles)} styles")
+        if not all(math.isfinite(w) for w in weights):
+            raise ValueError("Blend weights must be finite numbers")
+        if min(weights) < 0 or sum(weights) <= 0:
+            raise ValueError("Blend weights must be non-negative and not all zero")
+
+        total = sum(weights)
+        mean = sum(w / total * style.mean for w, style in zip(weights, styles))
+        matrix = sum(w / total * style.matrix for w, style in zip(weights, styles))
+        return cls(mean=mean, matrix=matrix)
+
+
+@dataclass
+class ContentFeatures:
+    """
+    Content-side products of the Linear network, reusable for any style
+    """
+
+    compressed: torch.Tensor  # (1, matrixSize, h, w) centered r41 features after MulLayer.compress
+    matrix: torch.Tensor  # (1, matrixSize, matrixSize) output of MulLayer.cnet
+
+
+class StyleMatrixBank:
+    """
+    StyleFeatures of every preset style image, stacked into one file (built by
+    `style_engine.tools.build_linear_presets`), so presets run without the style encoder
+    """
+
+    def __init__(self, styles: list[str], means: torch.Tensor, matrices: torch.Tensor):
+        self.styles = list(styles)
+        self.style_index = {name: i for i, name in enumerate(self.styles)}
+        self.means = means  # (N, C, 1, 1)
+        self.matrices = matrices  # (N, matrixSize, matrixSize)
+
+    @classmethod
+    def from_features(cls, features: dict[str, StyleFeatures]) -> "StyleMatrixBank":
+        return cls(
+            list(features),
+            torch.cat([f.mean.cpu() for f in features.values()]),
+            torch.cat([f.matrix.cpu() for f in features.values()]),
+        )
+
+    @classmethod
+    def load(cls, path, device="cpu") -> "StyleMatrixBank":
+        bank = torch.load(path, map_location=device, mmap=True, weights_only=True)
+        return cls(bank["styles"], bank["means"], bank["matrices"])
+
+    def save(self, path):
+        torch.save({"styles": self.styles, "means": self.means, "matrices": self.matrices}, path)
+
+    def __contains__(self, style_name: str) -> bool:
+        return style_name in self.style_index
+
+    def __getitem__(self, style_name: str) -> StyleFeatures:
+        i = self.style_index[style_name]
+        return StyleFeatures(mean=self.means[i : i + 1], matrix=self.matrices[i : i + 1])
+
+    def memory_footprint(self) -> int:
+        return sum(t.numel() * t.element_size() for t in (self.means, self.matrices))
 
 
 class LinearStyleTransferModel(BaseStyleTransferModel):
@@ -16,6 +102,11 @@ class LinearStyleTransferModel(BaseStyleTransferModel):
     Class used for stylization via Linear Transformation Network, inherites BaseStyleTransferModel
     """
 
+    compiled_encoder = None
+    compiled_decoder = None
+    supports_compile = True
+    supports_tiling = True
+
     @BaseStyleTransferModel.safe_load_wrapper
     def load_model(self, model_path):
         self.config = dict()
@@ -31,47 +122,153 @@ class LinearStyleTransferModel(BaseStyleTransferModel):
         self.dec = decoder4()
 
         self.matrix = MulLayer(self.config["layer"])
-        self.vgg.load_state_dict(
-            torch.load(self.config["vgg_dir"], map_location=self.device)
-        )
-        self.dec.load_state_dict(
-            torch.load(self.config["decoder_dir"], map_location=self.device)
-        )
-        self.matrix.load_state_dict(
-            torch.load(self.config["matrixPath"], map_location=self.device)
-        )
+        load_into(self.vgg, self.config["vgg_dir"], self.device)
+        load_into(self.dec, self.config["decoder_dir"], self.device)
+        load_into(self.matrix, self.config["matrixPath"], self.device)
 
         self.vgg.to(self.device)
         self.dec.to(self.device)
         self.matrix.to(self.device)
 
-    def preprocess(self, image: Image.Image) -> torch.Tensor:
+        # Set once at load time so that concurrent requests never mutate shared module state
+        self.vgg.eval()
+        self.dec.eval()
+        self.matrix.eval()
+
+    def compile(self, cache_dir, step=128, max_side=2048):
+        # The r41 encoder downsamples by 8 (three floor-rounding max pools), the decoder upsamples by 8
+        self.compiled_encoder = CompiledModule(
+            self.vgg.forward_r41,
+            cache_dir,
+            lambda height, width: (height // 8, width // 8),
+            step,
+            max_side,
+        )
+        self.compiled_decoder = CompiledModule(
+            self.dec, cache_dir, lambda height, width: (8 * height, 8 * width), step // 8, max_side // 8
+        )
+
+    def _encode(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the r41 features only (`encoder4.forward_r41`: no dict of every intermediate activation).
+        MulLayer flattens features with view(), which needs the standard layout.
+        """
+        return (self.compiled_encoder or self.vgg.forward_r41)(x).contiguous()
+
+    def _decode(self, feature: torch.Tensor) -> torch.Tensor:
+        return (self.compiled_decoder or self.dec)(self.prepare_input(feature)).float()
+
+    def modules(self) -> list[torch.nn.Module]:
+        modules = [getattr(self, name, None) for name in ("vgg", "dec", "matrix")]
+        return [m for m in modules if m is not None]
+
+    def conv_modules(self) -> list[torch.nn.Module]:
+        return [m for m in self.modules() if m is not getattr(self, "matrix", None)]
+
+    def preprocess(self, image: Image.Image, width: int = NEW_WIDTH) -> torch.Tensor:
         """
         Preprocessing is simply resizing image, no need for normalizing
         """
-        img = self.resize_img(image)
-        output = transforms.ToTensor()(img).unsqueeze(0).to(self.device)
+        img = self.resize_img(image, width)
+        return self.prepare_input(image_to_tensor(img, self.device))
 
-        return output
+    def encode_style(self, style_img: Image.Image) -> StyleFeatures:
+        """
+        Runs the style side of the network once (encoder -> channel mean -> snet matrix)
+        """
+        with torch.no_grad(), self.autocast():
+            sF = self._encode(self.preprocess(style_img))
+            sMean = sF.mean(dim=(2, 3), keepdim=True)
+            sMatrix = self.matrix.snet(sF.sub_(sMean))  # centered in place, sF is not used again
+            size = self.matrix.matrixSize
+            return StyleFeatures(mean=sMean.float(), matrix=sMatrix.view(sMatrix.size(0), size, size).float())
+
+    def encode_content(self, content_img: Image.Image, width: int = NEW_WIDTH) -> ContentFeatures:
+        """
+        Runs the content side of the network once (encoder -> centering -> compress and cnet matrix)
+        """
+        with torch.no_grad(), self.autocast():
+            cF = self._encode(self.preprocess(content_img, width))
+            cF.sub_(cF.mean(dim=(2, 3), keepdim=True))
+            size = self.matrix.matrixSize
+            cMatrix = self.matrix.cnet(cF)
+            return ContentFeatures(
+                compressed=self.matrix.compress(cF).float(),
+                matrix=cMatrix.view(cMatrix.size(0), size, size).float(),
+            )
 
     def stylize(self, content_img: Image.Image, style_img: Image.Image):
         """
         Takes in preprocessed content and style image as input, then performs a forward pass for stylization
         """
+        return self.decode(self.encode_content(content_img), self.encode_style(style_img))
+
+    def stylize_preset(
+        self, content_img: Image.Image, presets: StyleMatrixBank, style_name: str, width: int = NEW_WIDTH
+    ) -> Image.Image:
+        """
+        Stylizes with a preset's precomputed style features; the style image is never encoded
+        """
+        return self.decode(self.encode_content(content_img, width), presets[style_name])
+
+    def decode_raw(self, content: ContentFeatures, style: StyleFeatures) -> torch.Tensor:
+        """
+        Combines precomputed content and style features and returns the raw (1, 3, H, W) decoder output
+        (equivalent to MulLayer.forward with trans=True followed by the decoder)
+        """
+        with torch.no_grad(), self.autocast():
+            b, c, h, w = content.compressed.size()
+            transmatrix = torch.bmm(style.matrix, content.matrix)
+            transfeature = torch.bmm(transmatrix, content.compressed.view(b, c, -1))
+            feature = self.matrix.unzip(transfeature.view(b, c, h, w)).add_(style.mean)
+            return self._decode(feature)
+
+    def decode(self, content: ContentFeatures, style: StyleFeatures) -> Image.Image:
+        """
+        Decodes precomputed content and style features into the stylized image
+        """
+        return self.postprocess(self.decode_raw(content, style).squeeze(0))
+
+    def forward(self, batch: torch.Tensor, style: StyleFeatures) -> torch.Tensor:
+        """
+        Stylizes a preprocessed (N, 3, H, W) batch (e.g. video frames) with one style and returns the raw
+        decoder output; every sample gets its own content mean and cnet matrix
+        """
+        with torch.no_grad(), self.autocast():
+            cF = self._encode(batch)
+            cF.sub_(cF.mean(dim=(2, 3), keepdim=True))
+            n, size = cF.size(0), self.matrix.matrixSize
+            cMatrix = self.matrix.cnet(cF).view(n, size, size)
+            compressed = self.matrix.compress(cF)
+            del cF
+
+            b, c, h, w = compressed.size()
+            transmatrix = torch.bmm(style.matrix.expand(n, -1, -1), cMatrix)
+            transfeature = torch.bmm(transmatrix, compressed.view(b, c, -1))
+            feature = self.matrix.unzip(transfeature.view(b, c, h, w)).add_(style.mean)
+            return self._decode(feature)
+
+    def stylize_tiled(self, content_img: Image.Image, style: StyleFeatures, width=None, tile=512, overlap=64):
+        """
+        Stylizes at `width` (default: original width) tile by tile. The content mean and cnet matrix are
+        taken from a first pass over the whole image at NEW_WIDTH, so every tile gets the same transform.
+        """
+        img = self.resize_img(content_img, width or content_img.width)
+        size = self.matrix.matrixSize
+
         with torch.no_grad():
-            self.vgg.eval()
-            self.dec.eval()
-            self.matrix.eval()
-            sF = self.vgg(self.preprocess(style_img))
-            cF = self.vgg(self.preprocess(content_img))
-
-            feature, transmatrix = self.matrix(
-                cF[self.config["layer"]], sF[self.config["layer"]]
-            )
+            cF = self.vgg.forward_r41(downscale(img, NEW_WIDTH).to(self.device)).contiguous()
+            cMean = cF.mean(dim=(2, 3), keepdim=True)
+            cMatrix = self.matrix.cnet(cF - cMean).view(1, size, size)
+            transmatrix = torch.bmm(style.matrix, cMatrix)
 
-            output = self.dec(feature)
-            return self.postprocess(output.squeeze(0))
+        def run_tile(x):
+            with torch.no_grad():
+                cF = self.vgg.forward_r41(x.to(self.device)).contiguous()
+                compress_content = self.matrix.compress(cF.sub_(cMean))
+                b, c, h, w = compress_content.size()
+                transfeature = torch.bmm(transmatrix, compress_content.view(b, c, -1))
+                feature = self.matrix.unzip(transfeature.view(b, c, h, w)).add_(style.mean)
+                return self.dec(feature).clamp(0, 1)
 
-    def postprocess(self, tensor):
-        tensor = tensor.detach().squeeze(0).clamp(0, 1)
-        return transforms.ToPILImage()(tensor.cpu())
+        return Image.fromarray(run_tiled(img, run_tile, tile, overlap))
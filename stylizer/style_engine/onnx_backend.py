@@ -0,0 +1,229 @@
+"""
+ONNX Runtime backend.
+
+`export_johnson` / `export_linear` write the PyTorch networks as ONNX graphs with dynamic batch and
+spatial axes; `OnnxJohnsonModel` / `OnnxLinearModel` run them on ONNX Runtime's CPU provider behind the
+same interface as the PyTorch models (preprocessing, postprocessing and the Linear feature dataclasses are
+shared, so the feature and result caches work unchanged). Tiled inference needs the PyTorch modules.
+
+Linear is exported as four graphs mirroring `LinearStyleTransferModel`: the r41 encoder, the style head
+(mean + snet matrix), the content head (compress + cnet matrix) and the decoder (transform + unzip +
+decoder4), so style and content sides can still be computed and cached independently.
+"""
+
+from pathlib import Path
+
+import torch
+
+from .base import BaseStyleTransferModel, NEW_WIDTH
+from .johnson import JohnsonStyleTransferModel
+from .linear import ContentFeatures, LinearStyleTransferModel, StyleFeatures
+
+OPSET = 17
+LINEAR_GRAPHS = ("encoder", "style_head", "content_head", "decoder")
+
+
+class _LinearEncoder(torch.nn.Module):
+    def __init__(self, vgg):
+        super().__init__()
+        self.vgg = vgg
+
+    def forward(self, image):
+        return self.vgg.forward_r41(image)
+
+
+class _LinearStyleHead(torch.nn.Module):
+    def __init__(self, matrix):
+        super().__init__()
+        self.matrix = matrix
+
+    def forward(self, sF):
+        sMean = sF.mean(dim=(2, 3), keepdim=True)
+        size = self.matrix.matrixSize
+        return sMean, self.matrix.snet(sF - sMean).view(-1, size, size)
+
+
+class _LinearContentHead(torch.nn.Module):
+    def __init__(self, matrix):
+        super().__init__()
+        self.matrix = matrix
+
+    def forward(self, cF):
+        cF = cF - cF.mean(dim=(2, 3), keepdim=True)
+        size = self.matrix.matrixSize
+        return self.matrix.compress(cF), self.matrix.cnet(cF).view(-1, size, size)
+
+
+class _LinearDecoder(torch.nn.Module):
+    def __init__(self, matrix, dec):
+        super().__init__()
+        self.matrix = matrix
+        self.dec = dec
+
+    def forward(self, compressed, content_matrix, style_matrix, style_mean):
+        b, c, h, w = compressed.shape
+        transfeature = torch.bmm(torch.bmm(style_matrix, content_matrix), compressed.flatten(2))
+        feature = self.matrix.unzip(transfeature.view(b, c, h, w)) + style_mean
+        return self.dec(feature)
+
+
+def _export(module, inputs: tuple, input_names, output_names, dynamic_axes, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            module.eval(),
+            inputs,
+            str(path),
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET,
+            dynamo=False,
+        )
+
+
+def export_johnson(model: JohnsonStyleTransferModel, path: Path):
+    image = {0: "batch", 2: "height", 3: "width"}
+    example = torch.zeros(1, 3, 256, 256, device=model.device)
+    _export(model.model, (example,), ["input"], ["output"], {"input": image, "output": image}, Path(path))
+
+
+def export_linear(model: LinearStyleTransferModel, out_dir: Path):
+    out_dir = Path(out_dir)
+    device, size = model.device, model.matrix.matrixSize
+    spatial = {0: "batch", 2: "height", 3: "width"}
+    image = torch.zeros(1, 3, 256, 256, device=device)
+    features = model.vgg.forward_r41(image)
+    compressed = torch.zeros(1, size, *features.shape[2:], device=device)
+    matrix = torch.zeros(1, size, size, device=device)
+    batch = {0: "batch"}
+
+    _export(
+        _LinearEncoder(model.vgg), (image,), ["image"], ["features"],
+        {"image": spatial, "features": spatial}, out_dir / "encoder.onnx",
+    )
+    _export(
+        _LinearStyleHead(model.matrix), (features,), ["features"], ["mean", "matrix"],
+        {"features": spatial, "mean": batch, "matrix": batch}, out_dir / "style_head.onnx",
+    )
+    _export(
+        _LinearContentHead(model.matrix), (features,), ["features"], ["compressed", "matrix"],
+        {"features": spatial, "compressed": spatial, "matrix": batch}, out_dir / "content_head.onnx",
+    )
+    _export(
+        _LinearDecoder(model.matrix, model.dec),
+        (compressed, matrix, matrix, torch.zeros(1, features.shape[1], 1, 1, device=device)),
+        ["compressed", "content_matrix", "style_matrix", "style_mean"],
+        ["image"],
+        {"compressed": spatial, "content_matrix": batch, "style_matrix": batch, "style_mean": batch, "image": spatial},
+        out_dir / "decoder.onnx",
+    )
+
+
+def _session(path: Path, threads: int | None = None, memory_arena: bool = True):
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError("The ONNX backend needs onnxruntime: pip install onnxruntime") from e
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # The arena keeps freed activations for reuse: faster, but peak RSS grows with the largest input seen
+    options.enable_cpu_mem_arena = memory_arena
+    if threads:
+        options.intra_op_num_threads = threads
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def _run(session, **inputs) -> list[torch.Tensor]:
+    feeds = {name: tensor.detach().cpu().numpy() for name, tensor in inputs.items()}
+    return [torch.from_numpy(output) for output in session.run(None, feeds)]
+
+
+class OnnxJohnsonModel(JohnsonStyleTransferModel):
+    """
+    Johnson FFN on ONNX Runtime (graph written by `export_johnson`)
+    """
+
+    threads = None
+    memory_arena = True
+    supports_compile = False  # ONNX Runtime graphs, no torch modules to compile
+    supports_tiling = False
+
+    @BaseStyleTransferModel.safe_load_wrapper
+    def load_model(self, model_path):
+        model_path = Path(model_path)
+        if not model_path.exists():
+            raise FileNotFoundError(model_path)
+        self.session = _session(model_path, self.threads, self.memory_arena)
+        self.model_bytes = model_path.stat().st_size
+
+    def forward(self, batch: torch.Tensor) -> torch.Tensor:
+        (output,) = _run(self.session, input=batch)
+        return output
+
+    def memory_footprint(self) -> int:
+        return self.model_bytes
+
+    def to(self, device):
+        return self  # CPU provider only
+
+
+class OnnxLinearModel(LinearStyleTransferModel):
+    """
+    Linear Transformation Network on ONNX Runtime (graphs written by `export_linear`)
+    """
+
+    threads = None
+    memory_arena = True
+    supports_compile = False  # ONNX Runtime graphs, no torch modules to compile
+    supports_tiling = False
+
+    @BaseStyleTransferModel.safe_load_wrapper
+    def load_model(self, model_path):
+        model_path = Path(model_path)
+        paths = {name: model_path / f"{name}.onnx" for name in LINEAR_GRAPHS}
+        for path in paths.values():
+            if not path.exists():
+                raise FileNotFoundError(path)
+        self.sessions = {name: _session(path, self.threads, self.memory_arena) for name, path in paths.items()}
+        self.model_bytes = sum(path.stat().st_size for path in paths.values())
+
+    def encode_style(self, style_img) -> StyleFeatures:
+        (features,) = _run(self.sessions["encoder"], image=self.preprocess(style_img))
+        mean, matrix = _run(self.sessions["style_head"], features=features)
+        return StyleFeatures(mean=mean, matrix=matrix)
+
+    def encode_content(self, content_img, width: int = NEW_WIDTH) -> ContentFeatures:
+        (features,) = _run(self.sessions["encoder"], image=self.preprocess(content_img, width))
+        compressed, matrix = _run(self.sessions["content_head"], features=features)
+        return ContentFeatures(compressed=compressed, matrix=matrix)
+
+    def decode_raw(self, content: ContentFeatures, style: StyleFeatures) -> torch.Tensor:
+        (output,) = _run(
+            self.sessions["decoder"],
+            compressed=content.compressed,
+            content_matrix=content.matrix,
+            style_matrix=style.matrix,
+            style_mean=style.mean,
+        )
+        return output
+
+    def forward(self, batch: torch.Tensor, style: StyleFeatures) -> torch.Tensor:
+        n = batch.size(0)
+        (features,) = _run(self.sessions["encoder"], image=batch)
+        compressed, matrix = _run(self.sessions["content_head"], features=features)
+        (output,) = _run(
+            self.sessions["decoder"],
+            compressed=compressed,
+            content_matrix=matrix,
+            style_matrix=style.matrix.expand(n, -1, -1),
+            style_mean=style.mean.expand(n, -1, -1, -1),
+        )
+        return output
+
+    def memory_footprint(self) -> int:
+        return self.model_bytes
+
+    def to(self, device):
+        return self  # CPU provider only
@@ -0,0 +1,249 @@
+"""
+Multi-process inference pool.
+
+Worker processes hold the loaded models (each worker keeps its own ModelRegistry), so inference runs
+outside the web workers' GIL and a model is resident once per inference worker instead of once per web
+worker. Pixel buffers cross the process boundary through shared memory: the caller writes the decoded
+uint8 HWC image into a block, the worker writes its output into a new block, and only the block names,
+shapes and a small task description are pickled. Each task goes to the worker with the fewest tasks in
+flight.
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def to_shared(array: np.ndarray) -> tuple[shared_memory.SharedMemory, dict]:
+    """Copies `array` into a new shared memory block; returns the block and its pickle-friendly handle"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+
+
+def from_shared(handle: dict, unlink=False) -> np.ndarray:
+    """Returns a private copy of the array behind `handle`, optionally releasing the block"""
+    block = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        return np.ndarray(handle["shape"], dtype=np.dtype(handle["dtype"]), buffer=block.buf).copy()
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+class _Worker:
+    """Model loading and task execution inside a pool process"""
+
+    def __init__(self, device, model_root, registry_options):
+        from .registry import ModelRegistry
+
+        self.device = device
+        self.model_root = Path(model_root)
+        self.registry = ModelRegistry(**registry_options)
+
+    def johnson(self, style_name):
+        from .johnson import JohnsonStyleTransferModel
+
+        def load():
+            model = JohnsonStyleTransferModel(device=self.device)
+            model.load_model(self.model_root / "johnson" / f"{style_name}.pth")
+            return model
+
+        return self.registry.get_or_load(("johnson", style_name, self.device), load)
+
+    def linear(self):
+        from .linear import LinearStyleTransferModel
+
+        def load():
+            model = LinearStyleTransferModel(device=self.device)
+            model.load_model(self.model_root / "linear")
+            return model
+
+        return self.registry.get_or_load(("linear", None, self.device), load)
+
+    def run(self, task: dict, arrays: dict[str, np.ndarray]) -> np.ndarray:
+        from PIL import Image
+
+        from .linear import StyleFeatures
+
+        content_img = Image.fromarray(arrays["content"])
+        if task["kind"] == "johnson":
+            output = self.johnson(task["style_name"]).stylize(content_img)
+        elif task["kind"] == "linear":
+            model = self.linear()
+            if "style" in arrays:
+                style = model.encode_style(Image.fromarray(arrays["style"]))
+            else:
+                style = StyleFeatures(**{k: v.to(self.device) for k, v in task["style_features"].items()})
+            output = model.decode(model.encode_content(content_img), style)
+        else:
+            raise ValueError(f"Unknown task kind: {task['kind']}")
+        return np.asarray(output)
+
+
+def _worker_main(tasks, results, device, model_root, registry_options, torch_threads):
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    worker = _Worker(device, model_root, registry_options)
+
+    while (message := tasks.get()) is not None:
+        task_id, task, handles = message
+        try:
+            arrays = {name: from_shared(handle) for name, handle in handles.items()}
+            block, handle = to_shared(worker.run(task, arrays))
+            block.close()  # the caller unlinks it once copied out
+            results.put((task_id, handle, None))
+        except Exception as e:
+            logger.exception("Inference task %s failed", task_id)
+            results.put((task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class InferencePool:
+    """
+    `workers` processes that run stylization tasks; see `submit` for the task format
+    """
+
+    check_interval = 1.0  # seconds between liveness checks of the worker processes
+
+    def __init__(self, workers=2, device="cpu", model_root=None, registry_options=None, torch_threads=None):
+        self.workers = workers
+        self.device = device
+        self.model_root = model_root
+        self.registry_options = registry_options or dict()
+        self.torch_threads = torch_threads
+        self._context = mp.get_context("spawn")  # forking a process that already runs torch threads is unsafe
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._processes = []
+        self._queues = []
+        self._inflight = []  # tasks in flight per worker, used for least-loaded routing
+        self._pending = dict()  # task id -> (worker index, future, input blocks)
+        self._results = None
+        self.completed = 0
+        self.restarts = 0
+
+    def _spawn(self) -> tuple:
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(tasks, self._results, self.device, str(self.model_root), self.registry_options, self.torch_threads),
+            daemon=True,
+        )
+        process.start()
+        return process, tasks
+
+    def start(self):
+        with self._lock:
+            if self._processes:
+                return
+            self._results = self._context.Queue()
+            for _ in range(self.workers):
+                process, tasks = self._spawn()
+                self._processes.append(process)
+                self._queues.append(tasks)
+                self._inflight.append(0)
+            threading.Thread(target=self._collect, name="inference-pool-results", daemon=True).start()
+
+    def submit(self, task: dict, arrays: dict[str, np.ndarray]) -> Future:
+        """
+        Queues `task` and returns a Future resolving to the output as an (H, W, 3) uint8 array.
+
+        `task["kind"]` is "johnson" (with "style_name") or "linear" (with either a "style" entry in
+        `arrays` or precomputed "style_features" tensors). `arrays["content"]` is the (H, W, 3) uint8 image.
+        """
+        self.start()
+        blocks, handles = [], dict()
+        for name, array in arrays.items():
+            block, handles[name] = to_shared(np.ascontiguousarray(array))
+            blocks.append(block)
+
+        future = Future()
+        with self._lock:
+            task_id = next(self._ids)
+            index = min(range(self.workers), key=self._inflight.__getitem__)
+            self._inflight[index] += 1
+            self._pending[task_id] = (index, future, blocks)
+        self._queues[index].put((task_id, task, handles))
+        return future
+
+    def run(self, task: dict, arrays: dict[str, np.ndarray], timeout=None) -> np.ndarray:
+        return self.submit(task, arrays).result(timeout)
+
+    def _collect(self):
+        while True:
+            try:
+                task_id, handle, error = self._results.get(timeout=self.check_interval)
+            except queue.Empty:
+                self._replace_dead_workers()
+                continue
+
+            with self._lock:
+                index, future, blocks = self._pending.pop(task_id, (None, None, ()))
+                if future is not None:
+                    self._inflight[index] -= 1
+                    self.completed += 1
+            for block in blocks:
+                block.close()
+                block.unlink()
+            if future is None:
+                # Already failed because its worker was declared dead; just free the output block
+                if handle is not None:
+                    from_shared(handle, unlink=True)
+            elif error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(from_shared(handle, unlink=True))
+
+    def _replace_dead_workers(self):
+        """
+        Fails the tasks of workers that died (OOM kill, segfault, ...) and starts replacements, so callers
+        never wait on results that cannot come
+        """
+        failed = []
+        with self._lock:
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                logger.error("Inference worker %d died (exit code %s), restarting it", index, process.exitcode)
+                for task_id, (worker, future, blocks) in list(self._pending.items()):
+                    if worker == index:
+                        del self._pending[task_id]
+                        failed.append((future, blocks, process.exitcode))
+                self._processes[index], self._queues[index] = self._spawn()
+                self._inflight[index] = 0
+                self.restarts += 1
+
+        for future, blocks, exitcode in failed:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            future.set_exception(RuntimeError(f"Inference worker died (exit code {exitcode})"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(p.is_alive() for p in self._processes),
+                "inflight": list(self._inflight),
+                "completed": self.completed,
+                "restarts": self.restarts,
+            }
+
+    def close(self):
+        with self._lock:
+            for tasks in self._queues:
+                tasks.put(None)
+            for process in self._processes:
+                process.join(timeout=5)
+            self._processes, self._queues, self._inflight = [], [], []
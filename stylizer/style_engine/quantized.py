@@ -0,0 +1,112 @@
+"""
+INT8 inference for the Johnson TransformerNet (post-training static quantization, CPU only).
+
+Every convolution is quantized on its own: activations are quantized right before the conv and
+dequantized right after it, because each conv feeds an InstanceNorm2d (or the residual addition),
+which stays in float. The first and the last conv are kept in float by default, as they see raw
+pixels and produce them and lose the most from 8-bit activations.
+
+`quantize_johnson` calibrates the activation ranges on sample inputs; the result is saved beside
+the fp32 checkpoint (candy.pth -> candy.int8.pt) by `style_engine.tools.quantize_johnson` and loaded
+by `QuantizedJohnsonModel`.
+"""
+
+import warnings
+from pathlib import Path
+
+import torch
+import torch.ao.quantization as tq
+
+from style_engine.backends.johnson_fast.transformer_net import ConvLayer, TransformerNet
+from .base import BaseStyleTransferModel
+from .johnson import JohnsonStyleTransferModel
+
+QUANTIZED_SUFFIX = ".int8.pt"
+FLOAT_CONVS = ("conv1", "up3")  # ConvLayers left in float (names in TransformerNet)
+
+
+def quantized_path(model_path: Path) -> Path:
+    """
+    Returns the INT8 counterpart of a checkpoint, e.g. candy.pth -> candy.int8.pt
+    """
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + QUANTIZED_SUFFIX)
+
+
+class QuantizedConv(torch.nn.Module):
+    """Runs a float conv between a quantize and a dequantize step, so it can be swapped for an INT8 conv"""
+
+    def __init__(self, conv: torch.nn.Conv2d):
+        super().__init__()
+        self.quant = tq.QuantStub()
+        self.conv = conv
+        self.dequant = tq.DeQuantStub()
+
+    def forward(self, x):
+        return self.dequant(self.conv(self.quant(x)))
+
+
+def _prepare(model: TransformerNet, float_convs=FLOAT_CONVS) -> TransformerNet:
+    """Wraps the quantizable convs in place and inserts observers into them"""
+    conv_layers = {name: module for name, module in model.named_modules() if isinstance(module, ConvLayer)}
+    unknown = sorted(set(float_convs) - set(conv_layers))
+    if unknown:
+        raise ValueError(f"No ConvLayer named {', '.join(unknown)} (ConvLayers: {', '.join(conv_layers)})")
+
+    qconfig = tq.get_default_qconfig(torch.backends.quantized.engine)
+    for name, module in conv_layers.items():
+        if name not in float_convs:
+            module.conv2d = QuantizedConv(module.conv2d)
+            module.conv2d.qconfig = qconfig
+    return tq.prepare(model.eval(), inplace=True)
+
+
+def quantize_johnson(model: TransformerNet, batches, float_convs=FLOAT_CONVS) -> TransformerNet:
+    """
+    Returns an INT8 copy of an fp32 TransformerNet. `batches` are normalized (N, 3, H, W) inputs the
+    activation ranges are calibrated on.
+    """
+    quantized = TransformerNet()
+    quantized.load_state_dict(model.state_dict())
+    _prepare(quantized, float_convs)
+    with torch.no_grad():
+        for batch in batches:
+            quantized(batch)
+    return tq.convert(quantized, inplace=True)
+
+
+def save_quantized(model: TransformerNet, path: Path, float_convs=FLOAT_CONVS):
+    torch.save({"state_dict": model.state_dict(), "float_convs": list(float_convs)}, path)
+
+
+def load_quantized(path: Path) -> TransformerNet:
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    with warnings.catch_warnings():
+        # The observers never saw data: their placeholder qparams are overwritten by the state dict
+        warnings.simplefilter("ignore", UserWarning)
+        model = tq.convert(_prepare(TransformerNet(), checkpoint["float_convs"]), inplace=True)
+    model.load_state_dict(checkpoint["state_dict"], strict=True)
+    return model.eval()
+
+
+class QuantizedJohnsonModel(JohnsonStyleTransferModel):
+    """
+    Johnson FFN with INT8 convolutions (checkpoint written by `save_quantized`). Quantized kernels only
+    exist on the CPU, so the model always runs there.
+    """
+
+    supports_compile = False
+
+    def __init__(self, device="cpu"):
+        super().__init__("cpu")
+
+    @BaseStyleTransferModel.safe_load_wrapper
+    def load_model(self, model_path):
+        self.model = load_quantized(model_path)
+
+    def memory_footprint(self) -> int:
+        # INT8 weights live in packed params rather than parameters, the state dict has all of them
+        return sum(t.numel() * t.element_size() for t in self.model.state_dict().values() if torch.is_tensor(t))
+
+    def to(self, device):
+        return self  # CPU only
@@ -0,0 +1,61 @@
+import threading
+
+from .cache import LRUCache
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded style transfer models, keyed by (backend, style, device).
+
+    Models stay resident between requests and are evicted least-recently-used first once
+    `max_entries` or `max_bytes` is exceeded, or when unused for longer than `idle_ttl` seconds.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=None, idle_ttl=None):
+        self._cache = LRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=idle_ttl,
+            sizeof=lambda model: model.memory_footprint(),
+        )
+        self._lock = threading.Lock()
+        self._loading = dict()  # key -> lock held while that key is being loaded
+
+    def get_or_load(self, key: tuple, loader):
+        """
+        Returns the model stored under `key`, calling `loader()` to build it on a miss.
+        Concurrent callers asking for the same key wait for a single load.
+        """
+        model = self._cache.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another thread may have finished loading while we waited for the lock
+            if key in self._cache:
+                return self._cache.get(key)
+            try:
+                model = loader()
+                self._cache.put(key, model)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return model
+
+    def evict(self, key: tuple):
+        self._cache.pop(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def keys(self):
+        return self._cache.keys()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+def result_key(*parts) -> str:
+    """Content address of a result: sha256 over the string form of every identifying part"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Disk cache of encoded results, evicted least recently used first once the files exceed `max_bytes`.
+    Keys start with a `result_key` digest and may carry a suffix naming the encoding (e.g. "-webp85").
+
+    Files live in two levels of sharded directories (`ab/cd/<key>`) so no directory grows huge.
+    Writes are atomic and reads refresh the file's mtime, which is the LRU clock; several worker
+    processes can share one directory.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._bytes = sum(p.stat().st_size for p in self._files())
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    def get(self, key: str) -> bytes | None:
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size  # overwriting a key frees the old file
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+            self._bytes += len(data) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        return (path for path in self.root.glob("*/*/*") if path.suffix != ".tmp")
+
+    def _evict(self):
+        """Deletes the least recently used files until the cache is back under 90% of `max_bytes`"""
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # evicted by another worker
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
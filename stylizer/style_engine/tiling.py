@@ -0,0 +1,144 @@
+"""
+Tiled inference for high-resolution images.
+
+The image is processed as overlapping tiles whose outputs are feather-blended, one row of tiles at a
+time, so peak memory grows with the tile size (and image width) instead of the full pixel count.
+Global statistics (InstanceNorm2d for Johnson, the content mean/matrix for Linear) come from a
+first pass over a downscaled copy of the whole image, so every tile is normalized the same way.
+"""
+
+import copy
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+TILE_ALIGN = 8  # both backends downsample by 8, tiles and images are padded to a multiple of it
+
+
+def tile_spans(length: int, tile: int, overlap: int) -> list[tuple[int, int]]:
+    """
+    Returns (start, end) spans of at most `tile` pixels covering [0, length), overlapping by >= `overlap`
+    """
+    if length <= tile:
+        return [(0, length)]
+    stride = tile - overlap
+    starts = list(range(0, length - tile, stride)) + [length - tile]
+    return [(start, start + tile) for start in starts]
+
+
+def blend_ramp(length: int, overlap: int) -> np.ndarray:
+    """1D feathering weights: rise linearly over `overlap` pixels at both ends, never reaching zero"""
+    ramp = np.minimum(np.arange(1, length + 1), np.arange(length, 0, -1)) / (overlap + 1)
+    return np.minimum(ramp, 1.0).astype(np.float32)
+
+
+def run_tiled(image: np.ndarray, run_tile, tile=512, overlap=64) -> np.ndarray:
+    """
+    Applies `run_tile` to overlapping tiles of an (H, W, 3) uint8 image and blends the results.
+
+    `run_tile` receives a (1, 3, h, w) float tensor in [0, 1] and returns one of the same size.
+    """
+    tile = max(TILE_ALIGN, tile - tile % TILE_ALIGN)
+    overlap = min(overlap, tile // 2)
+    height, width = image.shape[:2]
+
+    # Reflect-pad to a multiple of TILE_ALIGN so every tile maps 1:1 to its output
+    pad_h, pad_w = -height % TILE_ALIGN, -width % TILE_ALIGN
+    if pad_h or pad_w:
+        image = np.pad(image, ((0, pad_h), (0, pad_w), (0, 0)), mode="reflect")
+    padded_h, padded_w = image.shape[:2]
+
+    rows, cols = tile_spans(padded_h, tile, overlap), tile_spans(padded_w, tile, overlap)
+    output = np.empty((padded_h, padded_w, 3), dtype=np.uint8)
+
+    # Accumulators only span one row of tiles; rows above the next tile row are final and get flushed
+    band = min(tile, padded_h)
+    acc = np.zeros((band, padded_w, 3), dtype=np.float32)
+    weight = np.zeros((band, padded_w, 1), dtype=np.float32)
+    band_top = 0
+
+    def flush(until):
+        n = until - band_top
+        output[band_top:until] = np.clip(acc[:n] / weight[:n] * 255 + 0.5, 0, 255).astype(np.uint8)
+        acc[: band - n], weight[: band - n] = acc[n:].copy(), weight[n:].copy()
+        acc[band - n :], weight[band - n :] = 0, 0
+
+    for y0, y1 in rows:
+        flush(y0)
+        band_top = y0
+        ramp_y = blend_ramp(y1 - y0, overlap)[:, None]
+        for x0, x1 in cols:
+            crop = torch.from_numpy(np.ascontiguousarray(image[y0:y1, x0:x1]))
+            crop = crop.permute(2, 0, 1).unsqueeze(0).float().div_(255)
+            result = run_tile(crop)[0].permute(1, 2, 0).float().cpu().numpy()
+            window = (ramp_y * blend_ramp(x1 - x0, overlap)[None, :])[:, :, None]
+            acc[: y1 - y0, x0:x1] += result * window
+            weight[: y1 - y0, x0:x1] += window
+    flush(padded_h)
+
+    return output[:height, :width]
+
+
+class _FrozenInstanceNorm2d(torch.nn.Module):
+    """InstanceNorm2d that normalizes with precomputed per-channel statistics instead of the input's"""
+
+    def __init__(self, norm: torch.nn.InstanceNorm2d, mean: torch.Tensor, var: torch.Tensor):
+        super().__init__()
+        self.weight = norm.weight  # shared with the original layer (None when not affine)
+        self.bias = norm.bias
+        self.register_buffer("scale", torch.rsqrt(var + norm.eps))
+        self.register_buffer("mean", mean)
+
+    def forward(self, x):
+        out = (x - self.mean) * self.scale
+        if self.weight is not None:
+            out = out * self.weight[None, :, None, None] + self.bias[None, :, None, None]
+        return out
+
+
+class _RecordingInstanceNorm2d(torch.nn.Module):
+    """Applies a (shared) InstanceNorm2d and keeps the per-channel statistics of its last input"""
+
+    def __init__(self, norm: torch.nn.InstanceNorm2d):
+        super().__init__()
+        self.norm = norm
+        self.stats = None
+
+    def forward(self, x):
+        self.stats = (x.mean(dim=(2, 3), keepdim=True), x.var(dim=(2, 3), keepdim=True, unbiased=False))
+        return self.norm(x)
+
+
+def _replace_children(model: torch.nn.Module, kind: type, make) -> None:
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, kind):
+                setattr(parent, name, make(child))
+
+
+def with_global_norm_stats(model: torch.nn.Module, x: torch.Tensor) -> torch.nn.Module:
+    """
+    Runs `model` once on `x` (a downscaled copy of the whole image) and returns a copy of the model whose
+    InstanceNorm2d layers reuse the statistics observed there, so tiles are normalized consistently.
+    """
+    # The shared (registry) model is never modified, not even by hooks: other threads may be running it.
+    # The copy shares its weights and norm layers; only the copy's module tree records and freezes stats.
+    norms = [m for m in model.modules() if isinstance(m, torch.nn.InstanceNorm2d)]
+    shared = norms + list(model.parameters()) + list(model.buffers())
+    frozen = copy.deepcopy(model, {id(obj): obj for obj in shared})
+
+    _replace_children(frozen, torch.nn.InstanceNorm2d, _RecordingInstanceNorm2d)
+    with torch.no_grad():
+        frozen(x)
+    _replace_children(frozen, _RecordingInstanceNorm2d, lambda r: _FrozenInstanceNorm2d(r.norm, *r.stats))
+    return frozen
+
+
+def downscale(image: np.ndarray, width: int) -> torch.Tensor:
+    """Returns a (1, 3, h, width) float tensor in [0, 1] of the image, area-downscaled"""
+    x = torch.from_numpy(np.ascontiguousarray(image)).permute(2, 0, 1).unsqueeze(0).float().div_(255)
+    if x.shape[-1] <= width:
+        return x
+    height = max(TILE_ALIGN, round(x.shape[-2] * width / x.shape[-1]))
+    return F.interpolate(x, size=(height, width), mode="area")
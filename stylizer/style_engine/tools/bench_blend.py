@@ -0,0 +1,57 @@
+"""
+Cost of mixing K styles: blending in transform-matrix space (one decode) versus stylizing K times and
+alpha-blending the pixels.
+
+Style features are encoded up front for both approaches, as they are cached in the server, so the
+timings cover the content encoder, the transfer and the decoder. Weights are equal.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_blend --styles cubism mosaic candy starry
+"""
+
+import argparse
+
+import numpy as np
+import torch
+from PIL import Image
+
+from style_engine.linear import LinearStyleTransferModel, StyleFeatures
+from style_engine.tools.common import STYLE_ROOT, WEIGHTS_ROOT, content_images, median_ms
+
+
+def pixel_blend(model, content_img: Image.Image, styles: list[StyleFeatures], width: int) -> Image.Image:
+    outputs = [
+        np.asarray(model.decode(model.encode_content(content_img, width), style), dtype=np.float32) for style in styles
+    ]
+    return Image.fromarray(np.mean(outputs, axis=0).round().astype(np.uint8))
+
+
+def matrix_blend(model, content_img: Image.Image, styles: list[StyleFeatures], width: int) -> Image.Image:
+    return model.decode(model.encode_content(content_img, width), StyleFeatures.blend(styles))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--styles", nargs="+", default=["cubism", "mosaic", "candy", "starry"])
+    parser.add_argument("--width", default=512, type=int)
+    parser.add_argument("--repeats", default=3, type=int)
+    parser.add_argument("--threads", default=None, type=int)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = LinearStyleTransferModel("cpu")
+    model.load_model(WEIGHTS_ROOT / "linear")
+    content_img = content_images()[0]
+    styles = [model.encode_style(Image.open(STYLE_ROOT / f"{name}.jpg").convert("RGB")) for name in args.styles]
+
+    single = median_ms(lambda: matrix_blend(model, content_img, styles[:1], args.width), args.repeats)
+    print(f"{'K':>3}{'pixel ms':>11}{'matrix ms':>11}{'matrix / 1 style':>18}")
+    for k in range(1, len(styles) + 1):
+        pixel = median_ms(lambda: pixel_blend(model, content_img, styles[:k], args.width), args.repeats)
+        matrix = median_ms(lambda: matrix_blend(model, content_img, styles[:k], args.width), args.repeats)
+        print(f"{k:>3}{pixel:>11.1f}{matrix:>11.1f}{matrix / single:>17.2f}x")
+
+
+if __name__ == "__main__":
+    main()
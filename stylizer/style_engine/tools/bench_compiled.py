@@ -0,0 +1,84 @@
+"""
+Compares eager and compiled (bucketed torch.compile) CPU latency per resolution bucket for both backends.
+
+For every input height the tool reports the bucket it lands in, the time of the bucket's first call
+(compile, or load from the disk cache), the median eager and compiled latency, and the largest output
+difference caused by padding to the bucket. Run it twice with the same --cache-dir: the second run
+shows the warm-start cost a restarted server pays.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_compiled --heights 576 683 768 1024
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import torch
+
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.tools.common import STYLIZER_ROOT, WEIGHTS_ROOT, median_ms
+
+
+def load_models(style: str):
+    johnson = JohnsonStyleTransferModel("cpu")
+    johnson.load_model(WEIGHTS_ROOT / "johnson" / f"{style}.pth")
+    linear = LinearStyleTransferModel("cpu")
+    linear.load_model(WEIGHTS_ROOT / "linear")
+    return johnson, linear
+
+
+def runners(johnson, linear):
+    """(name, eager fn, compiled fn) per network; Linear encoder and decoder are compiled separately"""
+    return [
+        ("johnson", johnson.model, johnson.compiled),
+        ("linear encoder", linear.vgg.forward_r41, linear.compiled_encoder),
+        ("linear decoder", linear.dec, linear.compiled_decoder),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--style", default="candy")
+    parser.add_argument("--width", default=1024, type=int)
+    parser.add_argument("--heights", default=[576, 683, 768, 1024], type=int, nargs="+")
+    parser.add_argument("--step", default=128, type=int)
+    parser.add_argument("--repeats", default=5, type=int)
+    parser.add_argument("--threads", default=None, type=int)
+    parser.add_argument("--cache-dir", default=STYLIZER_ROOT / "cache" / "compiled", type=Path)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    johnson, linear = load_models(args.style)
+    johnson.compile(args.cache_dir, step=args.step)
+    linear.compile(args.cache_dir, step=args.step)
+
+    header = f"{'network':<16}{'input':>11}{'bucket':>11}{'first s':>9}{'eager ms':>10}{'compiled ms':>13}{'speedup':>9}"
+    print(header + f"{'max diff':>10}{'mean diff':>11}")
+    with torch.no_grad():
+        for height in args.heights:
+            image = torch.rand(1, 3, height, args.width)
+            features = linear.vgg.forward_r41(image)
+            for name, eager, compiled in runners(johnson, linear):
+                x = features if name == "linear decoder" else image
+                bucket = compiled.bucket(*x.shape[2:])
+
+                start = time.perf_counter()
+                compiled.graph((1, x.shape[1], *bucket))
+                first_s = time.perf_counter() - start
+
+                eager_ms = median_ms(lambda: eager(x), args.repeats)
+                compiled_ms = median_ms(lambda: compiled(x), args.repeats)
+                diff = (eager(x) - compiled(x)).abs()
+                print(
+                    f"{name:<16}{'x'.join(map(str, x.shape[2:])):>11}{'x'.join(map(str, bucket)):>11}"
+                    f"{first_s:>9.1f}{eager_ms:>10.1f}{compiled_ms:>13.1f}{eager_ms / compiled_ms:>8.2f}x"
+                    f"{diff.max().item():>10.4f}{diff.mean().item():>11.5f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares the execution modes of the PyTorch models (fp32, channels_last, bf16, bf16_channels_last).
+
+For every network, mode and input height the tool reports the difference from fp32 (max / mean absolute
+difference of the raw network output and the max 8-bit level difference of the final image), the median
+latency of a full stylization and the peak resident set size. Latency and memory are measured in a fresh
+process per mode so that modes do not share allocator state or cached weight casts. The tool exits with
+status 1 when a mode's image differs from fp32 by more than `--max-levels`.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_execution_modes --heights 576 1024
+    python -m style_engine.tools.bench_execution_modes --modes fp32 bf16_channels_last --networks johnson
+"""
+
+import argparse
+
+import torch
+from PIL import Image
+
+from style_engine.base import EXECUTION_MODES
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.tools.common import (
+    STYLE_IMAGE,
+    WEIGHTS_ROOT,
+    check_parity,
+    content_image,
+    median_ms,
+    output_difference,
+    raw_output,
+    run_in_fresh_process,
+)
+
+WIDTH = 1024
+
+
+def load(network: str, mode: str, style: str):
+    if network == "johnson":
+        model = JohnsonStyleTransferModel("cpu")
+        model.load_model(WEIGHTS_ROOT / "johnson" / f"{style}.pth")
+    else:
+        model = LinearStyleTransferModel("cpu")
+        model.load_model(WEIGHTS_ROOT / "linear")
+    return model.set_execution_mode(mode)
+
+
+def run(model, network: str, image: Image.Image, style_img: Image.Image) -> tuple[torch.Tensor, Image.Image]:
+    """Returns the raw network output (Linear: decoder output) and the final image"""
+    output = raw_output(model, image, style_img if network == "linear" else None)
+    return output, model.postprocess(output.squeeze(0))
+
+
+def measure(network, mode, style, heights, repeats, threads) -> list[float]:
+    """Runs in a fresh process: loads one model in one mode and returns the latency of every height"""
+    if threads:
+        torch.set_num_threads(threads)
+    style_img = Image.open(STYLE_IMAGE).convert("RGB")
+    model = load(network, mode, style)
+    return [
+        median_ms(lambda: run(model, network, content_image(height, WIDTH), style_img), repeats) for height in heights
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--style", default="candy")
+    parser.add_argument("--networks", default=["johnson", "linear"], nargs="+", choices=["johnson", "linear"])
+    parser.add_argument("--modes", default=list(EXECUTION_MODES), nargs="+", choices=EXECUTION_MODES)
+    parser.add_argument("--heights", default=[576, 1024], type=int, nargs="+")
+    parser.add_argument("--repeats", default=3, type=int)
+    parser.add_argument("--threads", default=None, type=int)
+    parser.add_argument("--max-levels", default=2, type=int, help="Largest 8-bit difference from fp32 accepted")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    style_img = Image.open(STYLE_IMAGE).convert("RGB")
+
+    print(f"{'network':<9}{'mode':<20}{'input':>10}{'max diff':>10}{'mean diff':>11}{'max levels':>12}"
+          f"{'ms':>10}{'vs fp32':>9}{'peak MiB':>10}")
+    failures = []
+    for network in args.networks:
+        reference = load(network, "fp32", args.style)
+        expected = {height: run(reference, network, content_image(height, WIDTH), style_img) for height in args.heights}
+        del reference
+
+        baseline = None
+        for mode in args.modes:
+            latencies, peak = run_in_fresh_process(
+                measure, network, mode, args.style, args.heights, args.repeats, args.threads
+            )
+            if mode == "fp32":
+                baseline = latencies
+
+            model = load(network, mode, args.style)
+            for i, height in enumerate(args.heights):
+                output, image = run(model, network, content_image(height, WIDTH), style_img)
+                expected_output, expected_image = expected[height]
+                max_diff, mean_diff, levels = output_difference(output, expected_output, image, expected_image)
+                speedup = f"{baseline[i] / latencies[i]:>8.2f}x" if baseline else f"{'-':>9}"
+                print(
+                    f"{network:<9}{mode:<20}{f'{height}x{WIDTH}':>10}{max_diff:>10.4f}"
+                    f"{mean_diff:>11.5f}{levels:>12}{latencies[i]:>10.1f}{speedup}{peak:>10.0f}"
+                )
+                if levels > args.max_levels:
+                    failures.append(f"{network} {mode} {height}x{WIDTH}")
+    check_parity(failures, args.max_levels)
+
+
+if __name__ == "__main__":
+    main()
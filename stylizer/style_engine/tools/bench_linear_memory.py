@@ -0,0 +1,71 @@
+"""
+Peak memory of a Linear stylization at several content widths: the original pipeline versus the lean one.
+
+"full" is the upstream pipeline: `encoder4.forward` (a dict of every intermediate activation),
+`MulLayer.forward` and `decoder4`. "lean" is `LinearStyleTransferModel` (r41-only encoder, factored
+MulLayer, intermediates freed as soon as they are consumed). Every run happens in a fresh process and
+reports the growth of the peak resident set size over the loaded model, plus the time taken.
+Content images are 16:9; the style image is encoded at the default width.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_linear_memory --widths 1024 2048 4096
+"""
+
+import argparse
+import time
+
+import torch
+from PIL import Image
+
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.tools.common import STYLE_IMAGE, WEIGHTS_ROOT, content_image, peak_rss_mib, run_in_fresh_process
+
+
+def full(model, content_img, style_img, width):
+    layer = model.config["layer"]
+    with torch.no_grad():
+        cF = model.vgg(model.preprocess(content_img, width))[layer]
+        sF = model.vgg(model.preprocess(style_img))[layer]
+        feature, _ = model.matrix(cF, sF)
+        return model.postprocess(model.dec(feature).squeeze(0))
+
+
+def lean(model, content_img, style_img, width):
+    return model.decode(model.encode_content(content_img, width), model.encode_style(style_img))
+
+
+def measure(path, width, threads) -> tuple[float, float]:
+    """Runs in a fresh process: loads the model, runs one stylization, returns peak RSS growth and time"""
+    if threads:
+        torch.set_num_threads(threads)
+    model = LinearStyleTransferModel("cpu")
+    model.load_model(WEIGHTS_ROOT / "linear")
+    content_img = content_image(width * 9 // 16, width)
+    style_img = Image.open(STYLE_IMAGE).convert("RGB")
+
+    baseline = peak_rss_mib()
+    start = time.perf_counter()
+    {"full": full, "lean": lean}[path](model, content_img, style_img, width)
+    return peak_rss_mib() - baseline, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widths", default=[1024, 2048, 4096], type=int, nargs="+")
+    parser.add_argument("--paths", default=["full", "lean"], nargs="+", choices=["full", "lean"])
+    parser.add_argument("--threads", default=None, type=int)
+    args = parser.parse_args()
+
+    print(f"{'width':>6}{'path':>6}{'peak MiB':>10}{'s':>8}")
+    for width in args.widths:
+        for path in args.paths:
+            try:
+                (peak, seconds), _ = run_in_fresh_process(measure, path, width, args.threads)
+            except RuntimeError as e:
+                print(f"{width:>6}{path:>6}  failed ({e}, out of memory?)")
+                continue
+            print(f"{width:>6}{path:>6}{peak:>10.0f}{seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Checks the ONNX Runtime backend against PyTorch and compares their CPU latency and memory.
+
+Parity: for every input height, the raw network outputs of both backends are compared (max / mean
+absolute difference) along with the final 8-bit images (max level difference). The check fails (exit
+status 1) when a max difference exceeds `--atol` or the images differ by more than `--max-levels`; use
+`--parity-only` to run just the check, e.g. after re-exporting the graphs. Latency is the median of
+`--repeats` full stylizations after a warm-up. Memory is the peak resident set size of a fresh process
+that loads one backend and runs the same workload, so the backends do not share allocator state.
+
+Export the graphs first with `python -m style_engine.tools.export_onnx`.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_onnx --heights 576 1024
+    python -m style_engine.tools.bench_onnx --parity-only --heights 256
+"""
+
+import argparse
+
+import torch
+from PIL import Image
+
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.onnx_backend import OnnxJohnsonModel, OnnxLinearModel
+from style_engine.tools.common import (
+    STYLE_IMAGE,
+    WEIGHTS_ROOT,
+    check_parity,
+    content_image,
+    median_ms,
+    output_difference,
+    raw_output,
+    run_in_fresh_process,
+)
+
+WIDTH = 1024
+
+
+def load(network: str, backend: str, style: str, threads: int | None, memory_arena: bool = True):
+    if network == "johnson":
+        if backend == "onnx":
+            OnnxJohnsonModel.threads = threads
+            OnnxJohnsonModel.memory_arena = memory_arena
+            model = OnnxJohnsonModel("cpu")
+            model.load_model(WEIGHTS_ROOT / "onnx" / "johnson" / f"{style}.onnx")
+        else:
+            model = JohnsonStyleTransferModel("cpu")
+            model.load_model(WEIGHTS_ROOT / "johnson" / f"{style}.pth")
+    elif backend == "onnx":
+        OnnxLinearModel.threads = threads
+        OnnxLinearModel.memory_arena = memory_arena
+        model = OnnxLinearModel("cpu")
+        model.load_model(WEIGHTS_ROOT / "onnx" / "linear")
+    else:
+        model = LinearStyleTransferModel("cpu")
+        model.load_model(WEIGHTS_ROOT / "linear")
+    return model
+
+
+def stylize(model, network: str, image: Image.Image, style_img: Image.Image) -> Image.Image:
+    if network == "johnson":
+        return model.stylize(image)
+    return model.stylize(image, style_img)
+
+
+def measure(network, backend, style, heights, repeats, threads, memory_arena) -> list[float]:
+    """Runs in a fresh process: loads one backend and returns the latency of every height"""
+    if threads:
+        torch.set_num_threads(threads)
+    style_img = Image.open(STYLE_IMAGE).convert("RGB")
+    model = load(network, backend, style, threads, memory_arena)
+    return [
+        median_ms(lambda: stylize(model, network, content_image(height, WIDTH), style_img), repeats)
+        for height in heights
+    ]
+
+
+def parity(network, style, heights, threads):
+    style_img = Image.open(STYLE_IMAGE).convert("RGB")
+    torch_model = load(network, "torch", style, threads)
+    onnx_model = load(network, "onnx", style, threads)
+    raw_style = style_img if network == "linear" else None
+    rows = []
+    for height in heights:
+        image = content_image(height, WIDTH)
+        rows.append(
+            output_difference(
+                raw_output(onnx_model, image, raw_style),
+                raw_output(torch_model, image, raw_style),
+                stylize(onnx_model, network, image, style_img),
+                stylize(torch_model, network, image, style_img),
+            )
+        )
+    return rows
+
+
+def parity_only(args):
+    """Prints the parity of both networks and exits with status 1 if a tolerance is exceeded"""
+    print(f"{'network':<9}{'input':>11}{'max diff':>10}{'mean diff':>11}{'max levels':>12}")
+    failures = []
+    for network in ("johnson", "linear"):
+        for height, (max_diff, mean_diff, levels) in zip(
+            args.heights, parity(network, args.style, args.heights, args.threads)
+        ):
+            print(f"{network:<9}{f'{height}x{WIDTH}':>11}{max_diff:>10.5f}{mean_diff:>11.6f}{levels:>12}")
+            if max_diff > args.atol or levels > args.max_levels:
+                failures.append(f"{network} {height}x{WIDTH}")
+    check_parity(failures, args.max_levels, args.atol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--style", default="candy")
+    parser.add_argument("--heights", default=[576, 1024], type=int, nargs="+")
+    parser.add_argument("--repeats", default=5, type=int)
+    parser.add_argument("--threads", default=None, type=int)
+    parser.add_argument("--no-arena", action="store_true", help="Disable ONNX Runtime's CPU memory arena")
+    parser.add_argument("--atol", default=1e-3, type=float, help="Largest raw output difference accepted")
+    parser.add_argument("--max-levels", default=1, type=int, help="Largest 8-bit image difference accepted")
+    parser.add_argument("--parity-only", action="store_true", help="Check parity without timing the backends")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.parity_only:
+        parity_only(args)
+        return
+
+    print(f"{'network':<9}{'input':>11}{'max diff':>10}{'mean diff':>11}{'max levels':>12}"
+          f"{'torch ms':>10}{'onnx ms':>9}{'speedup':>9}")
+    peaks, failures = [], []
+    for network in ("johnson", "linear"):
+        options = (args.style, args.heights, args.repeats, args.threads, not args.no_arena)
+        results = {backend: run_in_fresh_process(measure, network, backend, *options) for backend in ("torch", "onnx")}
+        peaks.append((network, results["torch"][1], results["onnx"][1]))
+
+        for height, (max_diff, mean_diff, levels), torch_ms, onnx_ms in zip(
+            args.heights, parity(network, args.style, args.heights, args.threads), results["torch"][0], results["onnx"][0]
+        ):
+            print(
+                f"{network:<9}{f'{height}x{WIDTH}':>11}{max_diff:>10.5f}{mean_diff:>11.6f}{levels:>12}"
+                f"{torch_ms:>10.1f}{onnx_ms:>9.1f}{torch_ms / onnx_ms:>8.2f}x"
+            )
+            if max_diff > args.atol or levels > args.max_levels:
+                failures.append(f"{network} {height}x{WIDTH}")
+
+    print(f"\n{'network':<9}{'torch peak MiB':>16}{'onnx peak MiB':>15}")
+    for network, torch_peak, onnx_peak in peaks:
+        print(f"{network:<9}{torch_peak:>16.0f}{onnx_peak:>15.0f}")
+    check_parity(failures, args.max_levels, args.atol)
+
+
+if __name__ == "__main__":
+    main()
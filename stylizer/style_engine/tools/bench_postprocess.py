@@ -0,0 +1,80 @@
+"""
+Benchmarks output postprocessing: the previous per-backend paths (Johnson: float64 numpy de-normalize,
+clip, cast, moveaxis; Linear: torchvision ToPILImage) against the shared tensor-native
+`BaseStyleTransferModel.postprocess`, reporting time and bytes allocated per frame.
+
+Torch allocations are counted with the profiler (sum of every allocation), numpy and Python allocations
+with tracemalloc (peak above baseline). PIL's own image storage is the same for every path and not counted.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_postprocess --width 1024 --height 768
+"""
+
+import argparse
+import tracemalloc
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from torch.profiler import ProfilerActivity, profile
+
+from style_engine.johnson import IMAGENET_MEAN_1, IMAGENET_STD_1, JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.tools.common import median_ms
+
+
+def legacy_johnson(tensor: torch.Tensor) -> Image.Image:
+    output = tensor.to("cpu").numpy()
+    mean = IMAGENET_MEAN_1.reshape(-1, 1, 1)
+    std = IMAGENET_STD_1.reshape(-1, 1, 1)
+    output = (output * std) + mean
+    output = (np.clip(output, 0.0, 1.0) * 255).astype(np.uint8)
+    return Image.fromarray(np.moveaxis(output, 0, 2))
+
+
+def legacy_linear(tensor: torch.Tensor) -> Image.Image:
+    tensor = tensor.detach().squeeze(0).clamp(0, 1)
+    return transforms.ToPILImage()(tensor.cpu())
+
+
+def allocated_bytes(fn, tensor) -> tuple[int, int]:
+    """Returns (torch bytes allocated, numpy/Python peak bytes) for one call"""
+    tracemalloc.start()
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn(tensor)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    torch_bytes = sum(max(event.self_cpu_memory_usage, 0) for event in prof.events())
+    return torch_bytes, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", default=1024, type=int)
+    parser.add_argument("--height", default=768, type=int)
+    parser.add_argument("--repeats", default=20, type=int)
+    args = parser.parse_args()
+
+    frame = args.width * args.height * 3
+    johnson_output = torch.randn(3, args.height, args.width)
+    linear_output = torch.rand(3, args.height, args.width)
+
+    cases = [
+        ("johnson legacy", legacy_johnson, johnson_output),
+        ("johnson shared", JohnsonStyleTransferModel("cpu").postprocess, johnson_output),
+        ("linear legacy", legacy_linear, linear_output),
+        ("linear shared", LinearStyleTransferModel("cpu").postprocess, linear_output),
+    ]
+
+    print(f"{args.width}x{args.height}, one uint8 frame = {frame / 2**20:.1f} MiB")
+    print(f"{'path':<16}{'ms':>8}{'torch MiB':>12}{'numpy MiB':>12}{'frames':>9}")
+    for name, fn, tensor in cases:
+        ms = median_ms(lambda: fn(tensor), args.repeats)
+        torch_bytes, numpy_bytes = allocated_bytes(fn, tensor)
+        total = torch_bytes + numpy_bytes
+        print(f"{name:<16}{ms:>8.1f}{torch_bytes / 2**20:>12.1f}{numpy_bytes / 2**20:>12.1f}{total / frame:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares INT8 Johnson checkpoints with their fp32 originals: output quality and CPU throughput.
+
+Quality is the PSNR and SSIM (luma, 11x11 Gaussian window) of the INT8 output against the fp32 output
+for every bundled content image at `--width`. Throughput is images per second over `--repeats` batches
+of `--batch` images. Write the INT8 checkpoints first with `python -m style_engine.tools.quantize_johnson`.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.bench_quantized --styles candy mosaic
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.quantized import QuantizedJohnsonModel, quantized_path
+from style_engine.tools.common import CONTENT_ROOT, WEIGHTS_ROOT, content_images, psnr
+
+
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean SSIM of the luma channels of two uint8 RGB images"""
+    luma = torch.tensor([0.299, 0.587, 0.114], dtype=torch.float64)
+    x, y = (torch.tensor(img, dtype=torch.float64) @ luma for img in (a, b))
+    x, y = x[None, None], y[None, None]
+
+    coords = torch.arange(11, dtype=torch.float64) - 5
+    g = torch.exp(-(coords**2) / (2 * 1.5**2))
+    window = (g[:, None] * g[None, :] / g.sum() ** 2)[None, None]
+
+    def blur(t):
+        return F.conv2d(t, window)
+
+    mu_x, mu_y = blur(x), blur(y)
+    var_x = blur(x * x) - mu_x**2
+    var_y = blur(y * y) - mu_y**2
+    cov = blur(x * y) - mu_x * mu_y
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x**2 + mu_y**2 + c1) * (var_x + var_y + c2))
+    return ssim_map.mean().item()
+
+
+def images_per_second(model, batch: torch.Tensor, repeats: int) -> float:
+    model.forward(batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.forward(batch)
+    return repeats * batch.shape[0] / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--johnson-dir", default=WEIGHTS_ROOT / "johnson", type=Path)
+    parser.add_argument("--content-dir", default=CONTENT_ROOT, type=Path)
+    parser.add_argument("--styles", nargs="+", default=["candy"])
+    parser.add_argument("--width", default=1024, type=int)
+    parser.add_argument("--batch", default=1, type=int)
+    parser.add_argument("--repeats", default=3, type=int)
+    parser.add_argument("--threads", default=None, type=int)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    images = content_images(args.content_dir)
+
+    print(f"{'style':<14}{'PSNR dB':>9}{'min PSNR':>10}{'SSIM':>8}{'min SSIM':>10}{'fp32 img/s':>12}{'int8 img/s':>12}{'speedup':>9}")
+    for style in args.styles:
+        fp32 = JohnsonStyleTransferModel("cpu")
+        fp32.load_model(args.johnson_dir / f"{style}.pth")
+        int8 = QuantizedJohnsonModel()
+        int8.load_model(quantized_path(args.johnson_dir / f"{style}.pth"))
+
+        psnrs, ssims = [], []
+        for image in images:
+            reference = np.asarray(fp32.stylize(image, width=args.width))
+            output = np.asarray(int8.stylize(image, width=args.width))
+            psnrs.append(psnr(reference, output))
+            ssims.append(ssim(reference, output))
+
+        batch = fp32.preprocess(images[0], args.width).expand(args.batch, -1, -1, -1).contiguous()
+        fp32_rate = images_per_second(fp32, batch, args.repeats)
+        int8_rate = images_per_second(int8, batch, args.repeats)
+        print(
+            f"{style:<14}{np.mean(psnrs):>9.2f}{min(psnrs):>10.2f}{np.mean(ssims):>8.4f}{min(ssims):>10.4f}"
+            f"{fp32_rate:>12.3f}{int8_rate:>12.3f}{int8_rate / fp32_rate:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
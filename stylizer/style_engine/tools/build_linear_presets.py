@@ -0,0 +1,59 @@
+"""
+Precomputes the Linear style features (snet matrix and channel mean) of every preset style image.
+
+The features of all presets are stacked into one indexed file (see `style_engine.linear.StyleMatrixBank`),
+so the Linear model can serve the presets without running the style encoder. Style images are decoded
+and resized exactly as uploaded style images are, so a preset and an upload of the same file match.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.build_linear_presets
+    python -m style_engine.tools.build_linear_presets --styles candy mosaic --out /tmp/presets.pt
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import torch
+
+from style_engine.base import NEW_WIDTH
+from style_engine.ingest import decode_image
+from style_engine.linear import LinearStyleTransferModel, StyleMatrixBank
+from style_engine.tools.common import STYLE_ROOT, WEIGHTS_ROOT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linear-dir", default=WEIGHTS_ROOT / "linear", type=Path)
+    parser.add_argument("--style-dir", default=STYLE_ROOT, type=Path)
+    parser.add_argument("--styles", nargs="+", default=None, help="Styles to include (default: all)")
+    parser.add_argument("--out", default=WEIGHTS_ROOT / "linear_presets.pt", type=Path)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    paths = {
+        path.stem: path
+        for path in sorted(args.style_dir.iterdir())
+        if path.is_file() and path.suffix.lower() in (".jpg", ".jpeg", ".png")
+    }
+    if args.styles:
+        missing = set(args.styles) - set(paths)
+        if missing:
+            raise SystemExit(f"No style image for: {', '.join(sorted(missing))}")
+        paths = {name: paths[name] for name in args.styles}
+
+    model = LinearStyleTransferModel(args.device)
+    model.load_model(args.linear_dir)
+
+    start = time.perf_counter()
+    features = {name: model.encode_style(decode_image(path, NEW_WIDTH)) for name, path in paths.items()}
+    seconds = time.perf_counter() - start
+
+    bank = StyleMatrixBank.from_features(features)
+    bank.save(args.out)
+    print(f"Wrote {args.out} ({len(bank.styles)} styles, {args.out.stat().st_size / 2**10:.0f} KiB)")
+    print(f"Style encoding: {seconds:.1f}s in total, {1000 * seconds / len(bank.styles):.0f} ms per style (skipped by preset requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Builds a Johnson "style bank": one shared TransformerNet body plus per-style InstanceNorm2d parameters.
+
+Every style's normalization parameters start from its own checkpoint, and the conv body is taken from
+the `--base` style. Independently trained checkpoints do not share conv weights, so without fine-tuning
+only the base style is reproduced: every style is distilled into the shared body (`--steps`, default 2000)
+by matching the original per-style networks on random crops of the bundled content images.
+
+Each style is then scored against its own checkpoint (PSNR of the final images on the bundled content
+images at `--eval-width`). Styles below `--min-psnr` are left out of the bank, so the server keeps serving
+them from their own checkpoints instead of a visibly different style.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.build_style_bank
+    python -m style_engine.tools.build_style_bank --steps 4000 --train-body --min-psnr 28
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+
+from style_engine.backends.johnson_fast.style_bank import ConditionalInstanceNorm2d, StyleBankTransformerNet
+from style_engine.backends.johnson_fast.transformer_net import TransformerNet
+from style_engine.johnson import IMAGENET_MEAN_1, IMAGENET_STD_1, JohnsonStyleTransferModel
+from style_engine.tools.common import CONTENT_ROOT, WEIGHTS_ROOT, content_images, psnr
+from style_engine.weights import load_state_dict
+
+
+def load_checkpoints(johnson_dir: Path) -> dict[str, dict]:
+    return {
+        path.stem: load_state_dict(path, "cpu", key="state_dict")[0]
+        for path in sorted(johnson_dir.glob("*.pth"))
+    }
+
+
+def crops(content_dir: Path, size: int):
+    """Yields normalized random crops of the bundled content images forever"""
+    images = content_images(content_dir)
+    transform = transforms.Compose(
+        [
+            transforms.RandomResizedCrop(size, scale=(0.2, 1.0)),
+            transforms.RandomHorizontalFlip(),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=IMAGENET_MEAN_1, std=IMAGENET_STD_1),
+        ]
+    )
+    while True:
+        yield transform(random.choice(images)).float()
+
+
+def distill(bank, checkpoints, styles, args):
+    """Fits the bank to the original per-style networks (mixed-style batches, MSE on outputs)"""
+    teachers = dict()
+    for name in styles:
+        teacher = TransformerNet().to(args.device)
+        teacher.load_state_dict(checkpoints[name])
+        teachers[name] = teacher.eval().requires_grad_(False)
+
+    params = bank.parameters() if args.train_body else bank.norm_parameters()
+    optimizer = torch.optim.Adam(params, lr=args.lr)
+    samples = crops(Path(args.content_dir), args.crop)
+    bank.train()
+
+    for step in range(1, args.steps + 1):
+        picked = random.choices(range(len(styles)), k=args.batch_size)
+        x = torch.stack([next(samples) for _ in picked]).to(args.device)
+        with torch.no_grad():
+            target = torch.cat([teachers[styles[i]](x[j : j + 1]) for j, i in enumerate(picked)])
+
+        loss = torch.nn.functional.mse_loss(bank(x, torch.tensor(picked, device=args.device)), target)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+        if step % 50 == 0 or step == args.steps:
+            print(f"step {step}/{args.steps}  loss {loss.item():.5f}")
+
+    bank.eval()
+
+
+def evaluate(bank, checkpoints, styles, args) -> dict[str, float]:
+    """Mean PSNR of every style's bank output against its own checkpoint on the bundled content images"""
+    helper = JohnsonStyleTransferModel(args.device)  # preprocessing and uint8 conversion only
+    inputs = [helper.preprocess(image, args.eval_width) for image in content_images(Path(args.content_dir))]
+    bank.eval()
+
+    scores = dict()
+    with torch.no_grad():
+        for index, name in enumerate(styles):
+            teacher = TransformerNet().to(args.device)
+            teacher.load_state_dict(checkpoints[name])
+            teacher.eval()
+            style_ids = torch.tensor([index], device=args.device)
+            values = [
+                psnr(
+                    helper.to_uint8(teacher(x)).cpu().numpy(),
+                    helper.to_uint8(bank(x, style_ids)).cpu().numpy(),
+                )
+                for x in inputs
+            ]
+            scores[name] = float(np.mean(values))
+    return scores
+
+
+def keep_styles(bank, indices: list[int]) -> StyleBankTransformerNet:
+    """Returns a bank holding only the styles at `indices` (shared body unchanged)"""
+    kept = StyleBankTransformerNet(len(indices))
+    norm_names = {name for name, m in bank.named_modules() if isinstance(m, ConditionalInstanceNorm2d)}
+    state_dict = {
+        k: v[indices] if k.rsplit(".", 1)[0] in norm_names else v for k, v in bank.state_dict().items()
+    }
+    kept.load_state_dict(state_dict, strict=True)
+    return kept
+
+
+def tensor_bytes(state_dict: dict) -> int:
+    return sum(t.numel() * t.element_size() for t in state_dict.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights-dir", default=WEIGHTS_ROOT / "johnson", type=Path)
+    parser.add_argument("--content-dir", default=CONTENT_ROOT, type=Path)
+    parser.add_argument("--out", default=WEIGHTS_ROOT / "johnson_bank.pt", type=Path)
+    parser.add_argument("--base", default=None, help="style whose conv body is shared (default: first style)")
+    parser.add_argument("--steps", default=2000, type=int, help="distillation steps (0 = convert only)")
+    parser.add_argument("--train-body", action="store_true", help="also fine-tune the shared conv body")
+    parser.add_argument("--lr", default=1e-3, type=float)
+    parser.add_argument("--crop", default=256, type=int)
+    parser.add_argument("--batch-size", default=4, type=int)
+    parser.add_argument("--eval-width", default=384, type=int, help="width styles are scored at")
+    parser.add_argument("--min-psnr", default=30.0, type=float, help="styles scoring lower are left out (dB)")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    checkpoints = load_checkpoints(args.weights_dir)
+    if not checkpoints:
+        raise SystemExit(f"No Johnson checkpoints found in {args.weights_dir}")
+    styles = list(checkpoints)
+    base = args.base or styles[0]
+
+    bank = StyleBankTransformerNet(len(styles))
+    bank.load_body(checkpoints[base])
+    for index, name in enumerate(styles):
+        bank.load_style(index, checkpoints[name])
+    bank.to(args.device)
+
+    if args.steps:
+        start = time.perf_counter()
+        distill(bank, checkpoints, styles, args)
+        print(f"Distilled {len(styles)} styles in {time.perf_counter() - start:.0f}s")
+    else:
+        print(f"Converting only: styles other than '{base}' run on its conv body and will likely be left out")
+
+    scores = evaluate(bank, checkpoints, styles, args)
+    kept = [name for name in styles if scores[name] >= args.min_psnr]
+    print(f"{'style':<28}{'PSNR dB':>9}")
+    for name in styles:
+        print(f"{name:<28}{scores[name]:>9.2f}{'' if name in kept else '  left out'}")
+    if not kept:
+        raise SystemExit(f"No style reaches {args.min_psnr} dB, not writing {args.out}")
+
+    bank = keep_styles(bank, [styles.index(name) for name in kept])
+    state_dict = {k: v.detach().cpu().contiguous() for k, v in bank.state_dict().items()}
+    torch.save({"styles": kept, "state_dict": state_dict, "psnr": {name: scores[name] for name in kept}}, args.out)
+
+    before = sum(tensor_bytes(checkpoints[name]) for name in kept)
+    after = tensor_bytes(state_dict)
+    print(f"Wrote {args.out} ({len(kept)} of {len(styles)} styles, shared body from '{base}')")
+    print(f"Resident weights: {before / 2**20:.1f} MiB as separate checkpoints -> {after / 2**20:.1f} MiB as a bank")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Helpers shared by the benchmark and build tools: repository paths, test inputs, latency and peak memory
+measurements, and output comparisons.
+"""
+
+import math
+import multiprocessing
+import queue
+import resource
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+from style_engine.weights import MODEL_ROOT
+
+STYLIZER_ROOT = Path(__file__).resolve().parent.parent.parent
+WEIGHTS_ROOT = MODEL_ROOT
+IMAGES_ROOT = STYLIZER_ROOT / "transfer" / "static" / "images"
+STYLE_ROOT = IMAGES_ROOT / "johnson_fast_style"
+CONTENT_ROOT = IMAGES_ROOT / "content-images"
+STYLE_IMAGE = STYLE_ROOT / "candy.jpg"
+
+
+def content_image(height: int, width: int = 1024) -> Image.Image:
+    """Random content image, seeded by its height so every run and process gets the same pixels"""
+    rng = np.random.default_rng(height)
+    return Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+
+def content_images(content_dir: Path = CONTENT_ROOT) -> list[Image.Image]:
+    """The bundled content images, in file name order"""
+    return [Image.open(p).convert("RGB") for p in sorted(content_dir.iterdir()) if p.is_file()]
+
+
+def median_ms(fn, repeats: int) -> float:
+    """Median latency of `fn()` over `repeats` calls, after one warm-up call"""
+    fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _report(fn, args, results):
+    results.put((fn(*args), peak_rss_mib()))
+
+
+def run_in_fresh_process(fn, *args):
+    """
+    Runs `fn(*args)` in a spawned process and returns (its result, the process's peak RSS in MiB), so
+    measurements do not share allocator state or caches. `fn` must be a module-level function.
+    Raises RuntimeError if the process dies first (e.g. killed when out of memory).
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_report, args=(fn, args, results))
+    process.start()
+    try:
+        while True:
+            try:
+                result = results.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f"Measurement process died (exit code {process.exitcode})") from None
+    finally:
+        process.join()
+    return result
+
+
+def raw_output(model, image: Image.Image, style_img: Image.Image | None = None) -> torch.Tensor:
+    """Network output before postprocessing: Johnson's forward pass, or Linear's decoder output"""
+    if style_img is None:
+        return model.forward(model.preprocess(image))
+    return model.decode_raw(model.encode_content(image), model.encode_style(style_img))
+
+
+def output_difference(
+    output: torch.Tensor, expected: torch.Tensor, image: Image.Image, expected_image: Image.Image
+) -> tuple[float, float, int]:
+    """(max, mean) absolute difference of two raw outputs and the max 8-bit level difference of their images"""
+    diff = (output.float() - expected.float()).abs()
+    levels = np.abs(np.asarray(image, dtype=np.int16) - np.asarray(expected_image, dtype=np.int16))
+    return diff.max().item(), diff.mean().item(), int(levels.max())
+
+
+def check_parity(failures: list[str], max_levels: int, atol: float | None = None):
+    """Exits with status 1, naming the failed cases, when any output exceeded the tolerances"""
+    tolerance = f"max levels {max_levels}" if atol is None else f"atol {atol}, max levels {max_levels}"
+    if failures:
+        raise SystemExit(f"Parity check failed ({tolerance}): {', '.join(failures)}")
+    print(f"Parity OK ({tolerance})")
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return math.inf if mse == 0 else 10 * math.log10(255**2 / mse)
@@ -0,0 +1,29 @@
+"""
+Converts the `.pth` checkpoints under backends/weights/ to the memory-mappable `.mmap.pt` format.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.convert_weights [weights_dir]
+"""
+
+import sys
+from pathlib import Path
+
+from style_engine.weights import MMAP_SUFFIX, MODEL_ROOT, convert_checkpoint
+
+# Johnson checkpoints nest their weights under "state_dict", Linear ones are flat state dicts
+CHECKPOINT_KEYS = {"johnson": "state_dict", "linear": None}
+
+
+def convert_all(weights_root: Path):
+    for backend, key in CHECKPOINT_KEYS.items():
+        for model_path in sorted((weights_root / backend).glob("*.pth")):
+            out_path = convert_checkpoint(model_path, key=key)
+            print(f"{model_path.relative_to(weights_root)} -> {out_path.name}")
+
+
+if __name__ == "__main__":
+    root = Path(sys.argv[1]) if len(sys.argv) > 1 else MODEL_ROOT
+    if not root.is_dir():
+        sys.exit(f"Weights directory not found: {root}")
+    convert_all(root)
+    print(f"Done. Loaders now prefer the '{MMAP_SUFFIX}' files automatically.")
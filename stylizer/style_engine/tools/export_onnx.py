@@ -0,0 +1,49 @@
+"""
+Exports the PyTorch networks to ONNX for the ONNX Runtime backend (see `style_engine.onnx_backend`).
+
+Writes `onnx/johnson/<style>.onnx` for every Johnson checkpoint and the four Linear graphs to
+`onnx/linear/`, next to the PyTorch weights. All graphs have dynamic batch, height and width axes.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.export_onnx
+    python -m style_engine.tools.export_onnx --styles candy mosaic --skip-linear
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.onnx_backend import export_johnson, export_linear
+from style_engine.tools.common import WEIGHTS_ROOT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", default=WEIGHTS_ROOT, type=Path)
+    parser.add_argument("--out", default=WEIGHTS_ROOT / "onnx", type=Path)
+    parser.add_argument("--styles", nargs="+", default=None, help="Johnson styles to export (default: all)")
+    parser.add_argument("--skip-linear", action="store_true")
+    args = parser.parse_args()
+
+    styles = args.styles or sorted(path.stem for path in (args.weights / "johnson").glob("*.pth"))
+    for style in styles:
+        start = time.perf_counter()
+        model = JohnsonStyleTransferModel("cpu")
+        model.load_model(args.weights / "johnson" / f"{style}.pth")
+        path = args.out / "johnson" / f"{style}.onnx"
+        export_johnson(model, path)
+        print(f"{path} ({path.stat().st_size / 2**20:.1f} MiB, {time.perf_counter() - start:.1f}s)")
+
+    if not args.skip_linear:
+        start = time.perf_counter()
+        model = LinearStyleTransferModel("cpu")
+        model.load_model(args.weights / "linear")
+        export_linear(model, args.out / "linear")
+        size = sum(path.stat().st_size for path in (args.out / "linear").glob("*.onnx"))
+        print(f"{args.out / 'linear'} ({size / 2**20:.1f} MiB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
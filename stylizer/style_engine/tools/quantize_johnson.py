@@ -0,0 +1,45 @@
+"""
+Writes INT8 versions of the Johnson checkpoints (see `style_engine.quantized`).
+
+Activation ranges are calibrated on the bundled content images at `--width`; the result is saved
+beside the fp32 checkpoint as `<style>.int8.pt`.
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.quantize_johnson
+    python -m style_engine.tools.quantize_johnson --styles candy mosaic --width 768
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.quantized import FLOAT_CONVS, quantize_johnson, quantized_path, save_quantized
+from style_engine.tools.common import CONTENT_ROOT, WEIGHTS_ROOT, content_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--johnson-dir", default=WEIGHTS_ROOT / "johnson", type=Path)
+    parser.add_argument("--content-dir", default=CONTENT_ROOT, type=Path)
+    parser.add_argument("--styles", nargs="+", default=None, help="Styles to quantize (default: all)")
+    parser.add_argument("--width", default=512, type=int, help="Width calibration images are resized to")
+    parser.add_argument("--float-convs", nargs="*", default=list(FLOAT_CONVS), help="ConvLayers kept in float")
+    args = parser.parse_args()
+
+    images = content_images(args.content_dir)
+    styles = args.styles or sorted(path.stem for path in args.johnson_dir.glob("*.pth"))
+    for style in styles:
+        start = time.perf_counter()
+        model = JohnsonStyleTransferModel("cpu")
+        model.load_model(args.johnson_dir / f"{style}.pth")
+        batches = (model.preprocess(image, args.width) for image in images)
+        quantized = quantize_johnson(model.model, batches, args.float_convs)
+
+        path = quantized_path(args.johnson_dir / f"{style}.pth")
+        save_quantized(quantized, path, args.float_convs)
+        print(f"{path} ({path.stat().st_size / 2**20:.1f} MiB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Stylizes a video clip frame by frame (see `style_engine.video`) and reports the throughput.
+
+`--style` picks a Johnson preset (its checkpoint is loaded once); `--style-image` runs the Linear network
+with the style encoded once. Frames are decoded, stylized in batches of `--batch-size` and written as they
+come, so memory does not grow with the clip length (the peak RSS is printed to check).
+
+Usage (from the `stylizer/` directory):
+    python -m style_engine.tools.stylize_video clip.mp4 out.mp4 --style candy
+    python -m style_engine.tools.stylize_video clip.mp4 out.mp4 --style-image painting.jpg --width 640
+"""
+
+import argparse
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from style_engine.base import EXECUTION_MODES, NEW_WIDTH
+from style_engine.johnson import JohnsonStyleTransferModel
+from style_engine.linear import LinearStyleTransferModel
+from style_engine.tools.common import WEIGHTS_ROOT, peak_rss_mib
+from style_engine.video import stylize_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    style = parser.add_mutually_exclusive_group(required=True)
+    style.add_argument("--style", help="Johnson preset name, e.g. candy")
+    style.add_argument("--style-image", type=Path, help="Style image for the Linear network")
+    parser.add_argument("--width", default=NEW_WIDTH, type=int)
+    parser.add_argument("--batch-size", default=4, type=int)
+    parser.add_argument("--max-frames", default=None, type=int)
+    parser.add_argument("--fourcc", default="mp4v")
+    parser.add_argument("--mode", default="fp32", choices=EXECUTION_MODES)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--threads", default=None, type=int)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.style:
+        model = JohnsonStyleTransferModel(args.device)
+        model.load_model(WEIGHTS_ROOT / "johnson" / f"{args.style}.pth")
+    else:
+        model = LinearStyleTransferModel(args.device)
+        model.load_model(WEIGHTS_ROOT / "linear")
+    model.set_execution_mode(args.mode)
+    features = model.encode_style(Image.open(args.style_image).convert("RGB")) if args.style_image else None
+
+    stats = stylize_video(
+        model,
+        args.input,
+        args.output,
+        features,
+        width=args.width,
+        batch_size=args.batch_size,
+        fourcc=args.fourcc,
+        max_frames=args.max_frames,
+    )
+    print(f"Wrote {args.output}: {stats.frames} frames in {stats.seconds:.1f}s")
+    realtime = stats.throughput / stats.fps
+    print(f"Throughput: {stats.throughput:.2f} frames/s ({realtime:.2f}x real time at {stats.fps:.1f} fps)")
+    print(f"Peak RSS: {peak_rss_mib():.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Tensor-only, memory-mappable weight files.
+
+`convert_checkpoint` rewrites a `.pth` checkpoint as a flat {name: tensor} file saved next to it
+with the `.mmap.pt` suffix. `load_state_dict` prefers that file and maps it with `mmap=True`, so
+loading is near-instant and every worker process reads the same page-cache pages instead of
+unpickling its own copy. Checkpoints that have not been converted load exactly as before.
+"""
+
+from pathlib import Path
+import torch
+
+MMAP_SUFFIX = ".mmap.pt"
+
+# Checkpoints, exported graphs and style banks shipped with the package
+MODEL_ROOT = Path(__file__).resolve().parent / "backends" / "weights"
+
+
+def mmap_path(model_path: Path) -> Path:
+    """
+    Returns the memory-mappable counterpart of a checkpoint, e.g. candy.pth -> candy.mmap.pt
+    """
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + MMAP_SUFFIX)
+
+
+def load_state_dict(model_path: Path, device="cpu", key=None) -> tuple[dict, bool]:
+    """
+    Loads a state dict, memory-mapping the converted file when one exists.
+    `key` selects a nested state dict in legacy checkpoints (e.g. Johnson's "state_dict").
+    Returns (state_dict, mapped) where `mapped` tells whether the tensors are backed by the file.
+    """
+    fast_path = mmap_path(model_path)
+    if fast_path.exists():
+        state = torch.load(fast_path, map_location=device, mmap=True, weights_only=True)
+        return state, torch.device(device).type == "cpu"
+
+    state = torch.load(model_path, map_location=device)
+    return (state[key] if key else state), False
+
+
+def load_into(module: torch.nn.Module, model_path: Path, device="cpu", key=None):
+    """
+    Loads weights into `module`. Memory-mapped tensors are assigned rather than copied so the
+    module keeps pointing at the shared read-only pages.
+    """
+    state, mapped = load_state_dict(model_path, device, key)
+    module.load_state_dict(state, strict=True, assign=mapped)
+    return module
+
+
+def convert_checkpoint(model_path: Path, key=None) -> Path:
+    """
+    Writes the tensor-only, memory-mappable version of a `.pth` checkpoint and returns its path
+    """
+    state = torch.load(model_path, map_location="cpu")
+    if key:
+        state = state[key]
+    tensors = {name: tensor.detach().contiguous() for name, tensor in state.items()}
+
+    out_path = mmap_path(model_path)
+    torch.save(tensors, out_path)
+    return out_path
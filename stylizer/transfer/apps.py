@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class TransferConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transfer'
+
+    def ready(self):
+        from . import jobs, warmup
+        from .process import is_server_process
+
+        warmup.start()
+        if is_server_process():
+            jobs.get_pool().start()  # picks up jobs left queued by a previous run
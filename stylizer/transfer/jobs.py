@@ -0,0 +1,388 @@
+"""
+Background stylization jobs.
+
+POST /jobs/ stores the uploads under JOBS["ROOT"]/<job id>/ and enqueues a job; a pool of worker
+threads claims jobs from the queue backend, runs the handler registered for the job kind and writes
+the result next to the inputs. Clients poll (or long-poll) /jobs/<id>/ and fetch /jobs/<id>/result/.
+
+Claimed jobs hold a lease, renewed by a heartbeat while the handler runs, so long jobs (videos) are
+never taken over while alive. If a worker process dies mid-job, its lease expires and any worker that
+shares the queue picks the job up again, so queued and running jobs survive restarts.
+"""
+
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    payload: dict
+    result: str | None = None
+    error: str | None = None
+    attempts: int = 0
+    created: float = 0.0
+    updated: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+
+class JobQueue:
+    """
+    Queue backend interface. Backends must make `claim` atomic across threads and processes.
+    """
+
+    def enqueue(self, kind: str, payload: dict, job_id: str | None = None) -> Job:
+        raise NotImplementedError
+
+    def claim(self, lease: float) -> Job | None:
+        """Marks the oldest runnable job as running for `lease` seconds and returns it"""
+        raise NotImplementedError
+
+    def renew(self, job_id: str, lease: float) -> bool:
+        """Extends the lease of a running job to `lease` seconds from now; False if it is not running"""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, result: str):
+        raise NotImplementedError
+
+    def fail(self, job_id: str, error: str):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Job | None:
+        raise NotImplementedError
+
+    def purge(self, older_than: float) -> list[str]:
+        """Deletes finished jobs last updated before `older_than` and returns their ids"""
+        raise NotImplementedError
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Durable queue stored in a local SQLite file; needs no external service and can be shared by
+    every worker process on the host.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = str(path)
+        self.max_attempts = max_attempts
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_until REAL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)")
+
+    @contextmanager
+    def _connect(self):
+        """Autocommit connection, closed on exit (sqlite3's own context manager does not close)"""
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as db:
+            db.row_factory = sqlite3.Row
+            yield db
+
+    def _job(self, row) -> Job:
+        return Job(
+            id=row["id"],
+            kind=row["kind"],
+            status=row["status"],
+            payload=json.loads(row["payload"]),
+            result=row["result"],
+            error=row["error"],
+            attempts=row["attempts"],
+            created=row["created"],
+            updated=row["updated"],
+        )
+
+    def enqueue(self, kind, payload, job_id=None):
+        now = time.time()
+        job = Job(id=job_id or uuid.uuid4().hex, kind=kind, status=QUEUED, payload=payload, created=now, updated=now)
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, kind, QUEUED, json.dumps(payload), now, now),
+            )
+        return job
+
+    def claim(self, lease):
+        now = time.time()
+        with self._connect() as db:
+            try:
+                db.execute("BEGIN IMMEDIATE")
+                # Jobs whose lease ran out belong to a worker that died; give up on them after max_attempts
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated = ? "
+                    "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, "Worker died while running this job", now, RUNNING, now, self.max_attempts),
+                )
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                    "ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, updated = ? "
+                        "WHERE id = ?",
+                        (RUNNING, now + lease, now, row["id"]),
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return self.get(row["id"])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def renew(self, job_id, lease):
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND status = ?",
+                (now + lease, now, job_id, RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id, result):
+        self._finish(job_id, DONE, result=result)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error=error)
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def purge(self, older_than):
+        with self._connect() as db:
+            ids = [
+                row["id"]
+                for row in db.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, older_than)
+                )
+            ]
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        return ids
+
+
+class WorkerPool:
+    """
+    Threads that claim jobs from `queue` and run `handlers[job.kind](job, job_dir)`, which returns the
+    result path. Finished jobs older than `retention` seconds are purged along with their files.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: dict, root: Path, workers=2, lease=600, poll_interval=0.5, retention=86400):
+        self.queue = queue
+        self.handlers = handlers
+        self.root = Path(root)
+        self.workers = workers
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_purge = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Wakes idle workers after an enqueue instead of waiting for the next poll"""
+        self._wake.set()
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def _heartbeat(self, job_id: str) -> threading.Event:
+        """Renews the job's lease every lease / 3 seconds until the returned event is set"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease / 3):
+                try:
+                    self.queue.renew(job_id, self.lease)
+                except Exception:
+                    logger.exception("Could not renew the lease of job %s", job_id)
+
+        threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True).start()
+        return stop
+
+    def _run(self):
+        while True:
+            try:
+                job = self.queue.claim(self.lease)
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+
+            if job is None:
+                self._maybe_purge()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            heartbeat = self._heartbeat(job.id)
+            try:
+                result = self.handlers[job.kind](job, self.job_dir(job.id))
+                self.queue.complete(job.id, str(result))
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                self.queue.fail(job.id, str(e))
+            finally:
+                heartbeat.set()
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        for job_id in self.queue.purge(now - self.retention):
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+
+def run_stylize_job(job: Job, job_dir: Path) -> Path:
+    """Handler for "stylize" jobs: same inputs as /stylize/, result saved as PNG"""
+    from .utils import stylize_image
+
+    payload = job.payload
+    result_img = stylize_image(
+        job_dir / payload["content"],
+        job_dir / payload["style"] if payload.get("style") else None,
+        payload.get("style_path"),
+        payload.get("style_id"),
+        tiled=payload.get("tiled", False),
+        width=payload.get("width"),
+        quantized=payload.get("quantized"),
+    )
+    result_path = job_dir / "result.png"
+    result_img.save(result_path, format="PNG")
+    return result_path
+
+
+def run_video_job(job: Job, job_dir: Path) -> Path:
+    """
+    Handler for "video" jobs: a clip plus /stylize/ style fields, result saved as MP4. Frame count,
+    duration and throughput (frames per second) are kept in stats.json for the job status.
+    """
+    from .utils import stylize_video_file
+
+    payload = job.payload
+    result_path = job_dir / "result.mp4"
+    stats = stylize_video_file(
+        job_dir / payload["video"],
+        result_path,
+        job_dir / payload["style"] if payload.get("style") else None,
+        payload.get("style_path"),
+        payload.get("style_id"),
+        quantized=payload.get("quantized"),
+    )
+    stats_json = {"frames": stats.frames, "seconds": stats.seconds, "fps": stats.fps, "throughput": stats.throughput}
+    (job_dir / "stats.json").write_text(json.dumps(stats_json))
+    return result_path
+
+
+JOB_HANDLERS = {
+    "stylize": run_stylize_job,
+    "video": run_video_job,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """Returns the process-wide worker pool (built from settings.JOBS on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = settings.JOBS
+            queue = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+            _pool = WorkerPool(
+                queue,
+                JOB_HANDLERS,
+                root=config["ROOT"],
+                workers=config["WORKERS"],
+                lease=config["LEASE"],
+                retention=config["RETENTION"],
+            )
+        return _pool
+
+
+def submit(kind: str, files: dict, payload: dict) -> Job:
+    """
+    Saves uploaded `files` ({payload key: UploadedFile}) into the job directory and enqueues the job
+    """
+    pool = get_pool()
+    job_id = uuid.uuid4().hex
+    job_dir = pool.job_dir(job_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    for key, upload in files.items():
+        name = f"{key}{Path(upload.name).suffix.lower()}"
+        with open(job_dir / name, "wb") as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+        payload[key] = name
+
+    job = pool.queue.enqueue(kind, payload, job_id=job_id)
+    pool.start()
+    pool.notify()
+    return job
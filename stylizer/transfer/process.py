@@ -0,0 +1,16 @@
+import os
+import sys
+from pathlib import Path
+
+
+def is_server_process() -> bool:
+    """
+    True when this process serves traffic: a WSGI/ASGI server or the runserver child process,
+    but not management commands such as migrate or shell, nor the runserver autoreloader parent
+    """
+    argv = sys.argv
+    if Path(argv[0]).name == "manage.py":
+        if len(argv) < 2 or argv[1] != "runserver":
+            return False
+        return os.environ.get("RUN_MAIN") == "true" or "--noreload" in argv
+    return True
@@ -182,17 +182,37 @@ function showPreview (input, type) {
   checkImagesReady()
 }
 
-function downloadResult () {
+// Key of the last stylization's result, used by the download button to fetch a lossless PNG
+let lastResultKey = null
+
+async function downloadResult () {
   const img = document.getElementById('preview-image-result')
-  if (!img.src) {
+  if (!img.src || !lastResultKey) {
     alert('No image to download yet!')
     return
   }
 
-  const link = document.createElement('a')
-  link.href = img.src
-  link.download = 'stylized_image.png'
-  link.click()
+  // The preview shows compact WebP; the download asks for the same result as PNG
+  // (encoded from the pixels the server kept, so this does not stylize again)
+  try {
+    const response = await fetch(`/stylize/result/${lastResultKey}/`)
+
+    if (response.status === 404) {
+      alert('This result has expired, please stylize the image again.')
+      return
+    }
+    if (!response.ok) throw new Error('Download failed')
+
+    const url = URL.createObjectURL(await response.blob())
+    const link = document.createElement('a')
+    link.href = url
+    link.download = 'stylized_image.png'
+    link.click()
+    setTimeout(() => URL.revokeObjectURL(url), 0)
+  } catch (error) {
+    console.error('Error:', error)
+    alert('There was a problem downloading the stylized image.')
+  }
 }
 
 function showLoader () {
@@ -227,6 +247,13 @@ async function generateStylizedImage () {
     return
   }
 
+  lastResultKey = null
+
+  // Ask for a progressive response: a quick low-resolution preview, then the full result,
+  // both as WebP, which is several times smaller than PNG
+  formData.append('progressive', '1')
+  formData.append('format', 'webp')
+
   try {
     const response = await fetch('/stylize/', {
       method: 'POST',
@@ -235,17 +262,51 @@ async function generateStylizedImage () {
 
     if (!response.ok) throw new Error('Stylization failed')
 
-    const blob = await response.blob()
-    const imageUrl = URL.createObjectURL(blob)
+    await readEventStream(response, (eventName, data) => {
+      if (eventName === 'error') throw new Error(data.error)
 
-    stylizedImg.src = imageUrl
-    stylizedImg.style.display = 'block'
-    resultContainer.style.display = 'flex'
-    resultBox.classList.add('has-image')
+      // The preview replaces the skeleton loader straight away and stays blurred until the final image lands
+      stylizedImg.src = data.image
+      stylizedImg.classList.toggle('is-preview', eventName === 'preview')
+      if (data.result_key) lastResultKey = data.result_key
+      stylizedImg.style.display = 'block'
+      resultContainer.style.display = 'flex'
+      resultBox.classList.add('has-image')
 
-    hideLoader()
+      hideLoader()
+    })
   } catch (error) {
     console.error('Error:', error)
     alert('There was a problem generating the stylized image.')
   }
 }
+
+/**
+ * Reads a Server-Sent Events response body and calls onEvent(eventName, parsedData)
+ * for every complete event (EventSource cannot be used since the request is a POST)
+ */
+async function readEventStream (response, onEvent) {
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+
+      let eventName = 'message'
+      let data = ''
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event: ')) eventName = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      })
+      onEvent(eventName, JSON.parse(data))
+    }
+  }
+}
@@ -10,6 +10,16 @@ urlpatterns = [
     path("gallery/", views.gallery, name="gallery"),
     path("style-images/", views.style_images, name="style_images"),
     path("stylize/", views.stylize, name="stylize"),
+    path("stylize/multi/", views.stylize_multi, name="stylize_multi"),
+    path("stylize/blend/", views.blend, name="stylize_blend"),
+    path("stylize/result/<str:result_key>/", views.stylize_result, name="stylize_result"),
+    path("styles/", views.styles, name="styles"),
+    path("jobs/", views.job_create, name="job_create"),
+    path("jobs/video/", views.video_job_create, name="video_job_create"),
+    path("jobs/<str:job_id>/", views.job_status, name="job_status"),
+    path("jobs/<str:job_id>/result/", views.job_result, name="job_result"),
+    path("metrics/", views.metrics, name="metrics"),
+    path("healthz/", views.healthz, name="healthz"),
 ]
 
 if settings.DEBUG:
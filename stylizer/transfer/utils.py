@@ -1,40 +1,679 @@
+import re
 from pathlib import Path
+import numpy as np
 from PIL import Image
+from django.conf import settings
 import torch
 
-from style_engine.johnson import JohnsonStyleTransferModel
-from style_engine.linear import LinearStyleTransferModel
+from style_engine.batching import MicroBatcher
+from style_engine.cache import LRUCache
+from style_engine.executor import InferenceExecutor
+from style_engine.feature_cache import FeatureCache, image_digest
+from style_engine.ingest import decode_image
+from style_engine.johnson import JohnsonStyleTransferModel, JohnsonStyleBankModel
+from style_engine.base import NEW_WIDTH
+from style_engine.linear import LinearStyleTransferModel, StyleFeatures, ContentFeatures, StyleMatrixBank
+from style_engine.onnx_backend import OnnxJohnsonModel, OnnxLinearModel
+from style_engine.process_pool import InferencePool
+from style_engine.quantized import QuantizedJohnsonModel, quantized_path
+from style_engine.registry import ModelRegistry
+from style_engine.result_cache import ResultCache, result_key
+from style_engine.video import VideoStats, stylize_video
+from style_engine.weights import MODEL_ROOT
 
-MODEL_ROOT = (
-    Path(__file__).resolve().parent.parent / "style_engine" / "backends" / "weights"
+PRESET_STYLE_ROOT = Path(__file__).resolve().parent / "static" / "images" / "johnson_fast_style"
+
+if settings.INFERENCE_EXECUTOR.get("TORCH_THREADS"):
+    torch.set_num_threads(settings.INFERENCE_EXECUTOR["TORCH_THREADS"])
+
+def executor_limits() -> dict:
+    """
+    Per-model-kind executor limits. Batched Johnson calls mostly wait in the micro-batcher for one shared
+    forward pass, so those kinds get at least MAX_BATCH_SIZE slots; fewer would cap every batch below
+    its configured size.
+    """
+    batching = settings.JOHNSON_BATCHING
+    if not batching.get("ENABLED"):
+        return dict()
+    limit = max(settings.INFERENCE_EXECUTOR["PER_MODEL_LIMIT"], batching.get("MAX_BATCH_SIZE", 1))
+    return {kind: limit for kind in ("johnson", "johnson_int8", "johnson_bank")}
+
+
+# Async views hand inference to this executor: at most PER_MODEL_LIMIT concurrent calls per model
+# (MAX_BATCH_SIZE for batched Johnson models)
+inference_executor = InferenceExecutor(
+    per_model_limit=settings.INFERENCE_EXECUTOR["PER_MODEL_LIMIT"], limits=executor_limits()
+)
+
+# Loaded models are kept resident here and shared by every request in this process
+model_registry = ModelRegistry(
+    max_entries=settings.MODEL_REGISTRY.get("MAX_ENTRIES"),
+    max_bytes=settings.MODEL_REGISTRY.get("MAX_BYTES"),
+    idle_ttl=settings.MODEL_REGISTRY.get("IDLE_TTL"),
+)
+
+
+
+class UnknownStyleError(KeyError):
+    """Raised when a style id is not (or no longer) in the style feature cache"""
+
+    def __str__(self):
+        return f"Unknown or expired style id: {self.args[0]}"
+
+
+def get_device() -> str:
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+# Linear style features (style mean + snet matrix) keyed by the style image's content hash;
+# the hash doubles as the reusable style id returned to clients
+style_cache = FeatureCache(
+    StyleFeatures,
+    max_entries=settings.STYLE_FEATURE_CACHE.get("MAX_ENTRIES"),
+    max_bytes=settings.STYLE_FEATURE_CACHE.get("MAX_BYTES"),
+    spill_dir=settings.STYLE_FEATURE_CACHE.get("SPILL_DIR"),
+    max_spill_entries=settings.STYLE_FEATURE_CACHE.get("MAX_SPILL_ENTRIES"),
+    device=get_device(),
+)
+
+# Linear content features keyed by content hash and target width, so restyling one photo
+# only pays for the style side and the decoder
+content_cache = FeatureCache(
+    ContentFeatures,
+    max_entries=settings.CONTENT_FEATURE_CACHE.get("MAX_ENTRIES"),
+    max_bytes=settings.CONTENT_FEATURE_CACHE.get("MAX_BYTES"),
+    spill_dir=settings.CONTENT_FEATURE_CACHE.get("SPILL_DIR"),
+    max_spill_entries=settings.CONTENT_FEATURE_CACHE.get("MAX_SPILL_ENTRIES"),
+    device=get_device(),
+)
+
+
+# Encoded stylized outputs, content-addressed by inputs and engine parameters (see `stylize_cache_key`)
+result_cache = (
+    ResultCache(settings.RESULT_CACHE["ROOT"], max_bytes=settings.RESULT_CACHE["MAX_BYTES"])
+    if settings.RESULT_CACHE.get("ENABLED")
+    else None
+)
+
+# Pixels of recent /stylize/ results by result key, for lossless downloads encoded on demand
+recent_results = LRUCache(
+    max_bytes=settings.RESULT_CACHE.get("RECENT_MAX_BYTES", 0),
+    sizeof=lambda img: img.width * img.height * len(img.getbands()),
+)
+
+
+def open_rgb(source, width: int | None = NEW_WIDTH) -> Image.Image:
+    """
+    Decodes an uploaded/local image file to RGB; already decoded images are returned as is.
+    `width` is the width the image will be resized to (None keeps full resolution), which lets JPEGs
+    be decoded at reduced scale.
+    """
+    if isinstance(source, Image.Image):
+        return source
+    return decode_image(source, width)
+
+
+def with_execution_mode(model):
+    """
+    Converts a freshly loaded PyTorch model to EXECUTION_MODE["MODE"] (layout and autocast precision)
+    """
+    return model.set_execution_mode(settings.EXECUTION_MODE["MODE"])
+
+
+def compile_if_enabled(model):
+    """
+    Switches a freshly loaded model to bucketed torch.compile graphs when COMPILED_INFERENCE is enabled
+    and the model supports them
+    """
+    config = settings.COMPILED_INFERENCE
+    if config.get("ENABLED") and model.supports_compile:
+        model.compile(config["CACHE_DIR"], step=config["BUCKET_STEP"], max_side=config["MAX_SIDE"])
+    return model
+
+
+def use_onnx(need_torch: bool = False) -> bool:
+    """
+    True when requests are served by the ONNX Runtime backend; `need_torch` callers (tiled inference,
+    which the ONNX models do not support) always get the PyTorch models
+    """
+    return bool(settings.ONNX_RUNTIME.get("ENABLED")) and not need_torch
+
+
+def use_quantized(requested: bool | None = None) -> bool:
+    """
+    Whether Johnson presets run on their INT8 checkpoints: the request's choice if it made one,
+    else QUANTIZED_INFERENCE["ENABLED"]
+    """
+    return bool(settings.QUANTIZED_INFERENCE.get("ENABLED")) if requested is None else requested
+
+
+def get_johnson_model(
+    style_name: str, device: str, need_torch: bool = False, quantized: bool = False
+) -> JohnsonStyleTransferModel:
+    """
+    Returns the Johnson model for a predefined style, loading its weights on first use.
+    With `quantized`, the INT8 checkpoint is used (on the CPU, whatever `device` is).
+    """
+    if quantized:
+
+        def load():
+            model = QuantizedJohnsonModel()
+            model.load_model(quantized_path(MODEL_ROOT / "johnson" / f"{style_name}.pth"))
+            return model
+
+        return model_registry.get_or_load(("johnson_int8", style_name, "cpu"), load)
+
+    if use_onnx(need_torch):
+
+        def load():
+            OnnxJohnsonModel.threads = settings.ONNX_RUNTIME.get("INTRA_OP_THREADS")
+            OnnxJohnsonModel.memory_arena = settings.ONNX_RUNTIME.get("MEMORY_ARENA", True)
+            model = OnnxJohnsonModel(device="cpu")
+            model.load_model(Path(settings.ONNX_RUNTIME["ROOT"]) / "johnson" / f"{style_name}.onnx")
+            return model
+
+        return model_registry.get_or_load(("johnson_onnx", style_name, "cpu"), load)
+
+    def load():
+        model = JohnsonStyleTransferModel(device=device)
+        model.load_model(MODEL_ROOT / "johnson" / f"{style_name}.pth")
+        return compile_if_enabled(with_execution_mode(model))
+
+    return model_registry.get_or_load(("johnson", style_name, device), load)
+
+
+def get_style_bank_model(device: str) -> JohnsonStyleBankModel | None:
+    """
+    Returns the shared Johnson style bank, or None when style bank mode is disabled
+    """
+    if not settings.JOHNSON_STYLE_BANK.get("ENABLED"):
+        return None
+
+    def load():
+        model = JohnsonStyleBankModel(device=device)
+        model.load_model(Path(settings.JOHNSON_STYLE_BANK["PATH"]))
+        return with_execution_mode(model)
+
+    return model_registry.get_or_load(("johnson_bank", None, device), load)
+
+
+def get_linear_model(device: str, need_torch: bool = False) -> LinearStyleTransferModel:
+    """
+    Returns the Linear model, loading its weights on first use
+    """
+    if use_onnx(need_torch):
+
+        def load():
+            OnnxLinearModel.threads = settings.ONNX_RUNTIME.get("INTRA_OP_THREADS")
+            OnnxLinearModel.memory_arena = settings.ONNX_RUNTIME.get("MEMORY_ARENA", True)
+            model = OnnxLinearModel(device="cpu")
+            model.load_model(Path(settings.ONNX_RUNTIME["ROOT"]) / "linear")
+            return model
+
+        return model_registry.get_or_load(("linear_onnx", None, "cpu"), load)
+
+    def load():
+        model = LinearStyleTransferModel(device=device)
+        model.load_model(MODEL_ROOT / "linear")
+        return compile_if_enabled(with_execution_mode(model))
+
+    return model_registry.get_or_load(("linear", None, device), load)
+
+
+def get_linear_presets(device: str) -> StyleMatrixBank | None:
+    """
+    Returns the precomputed Linear style features of the presets, or None when LINEAR_PRESETS is disabled
+    """
+    if not settings.LINEAR_PRESETS.get("ENABLED"):
+        return None
+
+    def load():
+        return StyleMatrixBank.load(Path(settings.LINEAR_PRESETS["PATH"]), device)
+
+    return model_registry.get_or_load(("linear_presets", None, device), load)
+
+
+def linear_preset(style_path_str: None | str, quantized: bool | None = None) -> str | None:
+    """
+    Returns the preset name when the Linear model serves `style_path_str` from LINEAR_PRESETS, else None
+    (no preset, preset missing from the file, or INT8 Johnson explicitly requested)
+    """
+    if not style_path_str or quantized:
+        return None
+    presets = get_linear_presets(get_device())
+    style_name = Path(style_path_str).stem
+    return style_name if presets is not None and style_name in presets else None
+
+
+def _run_johnson_batch(key: tuple, tensors: list[torch.Tensor]) -> list[torch.Tensor]:
+    """
+    Runs one batched forward pass for requests sharing a (style, device, shape, quantized) key
+    """
+    style_name, device, _, quantized = key
+    model = get_johnson_model(style_name, device, quantized=quantized)
+    return list(model.forward(torch.cat(tensors)))
+
+
+# Concurrent Johnson requests for the same style and input shape share one forward pass
+johnson_batcher = MicroBatcher(
+    _run_johnson_batch,
+    max_batch_size=settings.JOHNSON_BATCHING.get("MAX_BATCH_SIZE", 1),
+    max_wait=settings.JOHNSON_BATCHING.get("MAX_WAIT", 0),
+)
+
+
+def _run_style_bank_batch(key: tuple, items: list[tuple]) -> list[torch.Tensor]:
+    """
+    Runs one mixed-style forward pass through the style bank for requests sharing a (device, shape) key
+    """
+    device, _ = key
+    model = get_style_bank_model(device)
+    tensors, style_names = zip(*items)
+    return list(model.forward(torch.cat(tensors), model.style_ids(style_names)))
+
+
+# With the style bank, requests for different styles can still share a batch
+style_bank_batcher = MicroBatcher(
+    _run_style_bank_batch,
+    max_batch_size=settings.JOHNSON_BATCHING.get("MAX_BATCH_SIZE", 1),
+    max_wait=settings.JOHNSON_BATCHING.get("MAX_WAIT", 0),
+)
+
+
+def stylize_johnson(content_img: Image.Image, style_name: str, device: str, quantized: bool = False) -> Image.Image:
+    """
+    Stylizes with a predefined Johnson style, going through the micro-batcher when enabled.
+    Styles present in the style bank (when enabled) are served by the shared bank model,
+    unless the INT8 checkpoint is asked for.
+    """
+    bank = None if quantized else get_style_bank_model(device)
+    if bank is not None and style_name in bank.style_index:
+        if not settings.JOHNSON_BATCHING.get("ENABLED"):
+            return bank.stylize(content_img, style_name)
+        input_tensor = bank.preprocess(content_img)
+        key = (device, tuple(input_tensor.shape))
+        return bank.postprocess(style_bank_batcher.submit(key, (input_tensor, style_name)))
+
+    model = get_johnson_model(style_name, device, quantized=quantized)
+    if not settings.JOHNSON_BATCHING.get("ENABLED"):
+        return model.stylize(content_img)
+
+    input_tensor = model.preprocess(content_img)
+    key = (style_name, device, tuple(input_tensor.shape), quantized)
+    return model.postprocess(johnson_batcher.submit(key, input_tensor))
+
+
+# Optional out-of-process inference: the web process then only decodes uploads and encodes results
+inference_pool = (
+    InferencePool(
+        workers=settings.INFERENCE_POOL["WORKERS"],
+        device=get_device(),
+        model_root=MODEL_ROOT,
+        registry_options={
+            "max_entries": settings.MODEL_REGISTRY.get("MAX_ENTRIES"),
+            "max_bytes": settings.MODEL_REGISTRY.get("MAX_BYTES"),
+            "idle_ttl": settings.MODEL_REGISTRY.get("IDLE_TTL"),
+        },
+        torch_threads=settings.INFERENCE_POOL.get("TORCH_THREADS"),
+    )
+    if settings.INFERENCE_POOL.get("ENABLED")
+    else None
 )
 
 
+def stylize_in_pool(
+    content_img: Image.Image,
+    style_name: str | None = None,
+    style_img: Image.Image | None = None,
+    style_id: str | None = None,
+    style: StyleFeatures | None = None,
+) -> Image.Image:
+    """
+    Runs a Johnson (`style_name`) or Linear stylization on the inference pool.
+    Cached Linear style features (or the given `style`, e.g. a Linear preset) are sent along, so workers
+    only encode styles they have not seen.
+    """
+    arrays = {"content": np.asarray(content_img)}
+    if style_name:
+        task = {"kind": "johnson", "style_name": style_name}
+    else:
+        task = {"kind": "linear"}
+        features = style
+        if features is None:
+            if style_img is not None:
+                style_id = image_digest(style_img)
+            features = style_cache.get(style_id) if re.fullmatch(r"[0-9a-f]{64}", style_id) else None
+        if features is not None:
+            task["style_features"] = {k: v.cpu() for k, v in vars(features).items()}
+        elif style_img is not None:
+            arrays["style"] = np.asarray(style_img)
+        else:
+            raise UnknownStyleError(style_id)
+    return Image.fromarray(inference_pool.run(task, arrays, timeout=settings.INFERENCE_POOL.get("TIMEOUT")))
+
+
+def inference_key(style_path_str: None | str = None, quantized: bool | None = None) -> tuple:
+    """
+    Returns the executor key of the model that will serve a request (see `inference_executor`)
+    """
+    if not style_path_str or linear_preset(style_path_str, quantized):
+        return ("linear",)
+    style_name = Path(style_path_str).stem
+    if use_quantized(quantized):
+        return ("johnson_int8", style_name)
+    bank = get_style_bank_model(get_device())
+    if bank is not None and style_name in bank.style_index:
+        return ("johnson_bank",)
+    return ("johnson", style_name)
+
+
+def stylize_cache_key(
+    content_img: Image.Image,
+    style_img: Image.Image | None = None,
+    style_path_str: None | str = None,
+    style_id: None | str = None,
+    tiled: bool = False,
+    width: None | int = None,
+    quantized: bool | None = None,
+) -> str:
+    """
+    Result cache key (and ETag) of a /stylize/ request: decoded content hash, style identity and the
+    parameters that change the output. Linear style ids are the style image's hash, so an uploaded
+    style and its id share entries.
+    """
+    if style_path_str:
+        style = Path(style_path_str).stem
+    else:
+        style = image_digest(style_img) if style_img is not None else style_id
+    if tiled:
+        params = (width or content_img.width, settings.TILING["TILE"], settings.TILING["OVERLAP"])
+    else:
+        params = (NEW_WIDTH, "onnx" if use_onnx() else settings.EXECUTION_MODE["MODE"])
+    key = inference_key(style_path_str, quantized)
+    return result_key(image_digest(content_img), key, style, tiled, params)
+
+
+def encode_style(style_img: Image.Image, device: str) -> tuple[str, StyleFeatures]:
+    """
+    Returns (style_id, style features), running the Linear style encoder only on a cache miss
+    """
+    style_id = image_digest(style_img)
+    features = style_cache.get(style_id)
+    if features is None:
+        features = get_linear_model(device).encode_style(style_img)
+        style_cache.put(style_id, features)
+    return style_id, features
+
+
+def encode_content(content_img: Image.Image, device: str, width: int = NEW_WIDTH) -> ContentFeatures:
+    """
+    Returns Linear content features, running the content encoder only on a cache miss
+    """
+    key = f"{image_digest(content_img)}-{width}"
+    features = content_cache.get(key)
+    if features is None:
+        features = get_linear_model(device).encode_content(content_img, width)
+        content_cache.put(key, features)
+    return features
+
+
+def resolve_style(style_img: Image.Image | None, style_id: str | None, device: str) -> StyleFeatures:
+    """
+    Returns Linear style features for an uploaded style image or a previously returned style id
+    """
+    if style_img is not None:
+        _, style = encode_style(style_img, device)
+        return style
+
+    # Style ids are sha256 digests; anything else cannot be in the cache (and must not reach the disk tier)
+    style = style_cache.get(style_id) if re.fullmatch(r"[0-9a-f]{64}", style_id) else None
+    if style is None:
+        raise UnknownStyleError(style_id)
+    return style
+
+
+def preset_style(style_path_str: str, device: str) -> StyleFeatures:
+    """
+    Returns Linear style features for a preset: precomputed from LINEAR_PRESETS when available,
+    else encoded from the preset's style image (and cached like an upload)
+    """
+    style_name = Path(style_path_str).stem
+    presets = get_linear_presets(device)
+    if presets is not None and style_name in presets:
+        return presets[style_name]
+
+    path = PRESET_STYLE_ROOT / Path(style_path_str).name  # never outside the preset folder
+    if not path.is_file():
+        raise UnknownStyleError(style_name)
+    _, style = encode_style(open_rgb(path), device)
+    return style
+
+
+def register_style(style_file) -> str:
+    """
+    Encodes an uploaded style image and returns the style id clients can send instead of the image
+    """
+    style_img = open_rgb(style_file)
+    style_id, _ = encode_style(style_img, get_device())
+    return style_id
+
+
+def stylize_tiled(model, content_img: Image.Image, *args, **tile_options) -> Image.Image:
+    """
+    Runs `model.stylize_tiled`, refusing models whose `supports_tiling` is off
+    """
+    if not model.supports_tiling:
+        raise ValueError(f"{type(model).__name__} does not support tiled inference")
+    return model.stylize_tiled(content_img, *args, **tile_options)
+
+
 def stylize_image(
-    content_file: str, style_file: None | str = None, style_path_str: None | str = None
+    content_file: str,
+    style_file: None | str = None,
+    style_path_str: None | str = None,
+    style_id: None | str = None,
+    tiled: bool = False,
+    width: None | int = None,
+    quantized: bool | None = None,
 ) -> Image.Image:
     """
-    Performs stylization via Johnson or Linear network, depending on input
+    Performs stylization via Johnson or Linear network, depending on input.
+    With `tiled`, the output keeps the original resolution (or `width`, capped by TILING["MAX_WIDTH"])
+    and is computed tile by tile. `quantized` picks the INT8 Johnson checkpoints (default: QUANTIZED_INFERENCE).
     """
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
+    device = get_device()
+    preset = linear_preset(style_path_str, quantized)
+    if preset:
+        style_path_str = None  # served like an uploaded style, from the precomputed features
+    quantized = use_quantized(quantized) and bool(style_path_str)
 
     # Load content image
-    content_img: Image.Image = Image.open(content_file).convert("RGB")
+    content_img: Image.Image = open_rgb(content_file, (width if tiled else NEW_WIDTH))
 
     # Convert style path string to local path and open style image
-    style_img: Image.Image | None = Image.open(style_file).convert("RGB") if style_file else None
+    style_img: Image.Image | None = open_rgb(style_file) if style_file else None
+
+    tile_options = dict()
+    if tiled:
+        tile_options = {
+            "width": min(width or content_img.width, settings.TILING["MAX_WIDTH"]),
+            "tile": settings.TILING["TILE"],
+            "overlap": settings.TILING["OVERLAP"],
+        }
+
+    if inference_pool is not None and not tiled and not quantized:
+        style_name = Path(style_path_str).stem if style_path_str else None
+        style = get_linear_presets(device)[preset] if preset else None
+        return stylize_in_pool(content_img, style_name, style_img, style_id, style)
 
     # Uses johnson model if input is a style_path_str (chosen from predefined styles)
     if style_path_str:
         style_name = Path(style_path_str).stem
-        model_path = MODEL_ROOT / "johnson" / f"{style_name}.pth"
+        if tiled:
+            model = get_johnson_model(style_name, device, need_torch=True, quantized=quantized)
+            return stylize_tiled(model, content_img, **tile_options)
+        return stylize_johnson(content_img, style_name, device, quantized)
 
-        model = JohnsonStyleTransferModel(device=device)
-        model.load_model(model_path)
-    else:
-        model = LinearStyleTransferModel(device=device)
-        model.load_model(MODEL_ROOT / "linear")
+    style = get_linear_presets(device)[preset] if preset else resolve_style(style_img, style_id, device)
+    if tiled:
+        return stylize_tiled(get_linear_model(device, need_torch=True), content_img, style, **tile_options)
 
-    output: Image.Image = model.stylize(content_img, style_img)
+    model = get_linear_model(device)
+    output: Image.Image = model.decode(encode_content(content_img, device), style)
     return output
+
+
+def stylize_blend(
+    content_file, style_files=(), style_paths=(), style_ids=(), weights: list[float] | None = None
+) -> Image.Image:
+    """
+    Stylizes with a weighted mix of styles (presets, style ids and uploads, weighted in that order)
+    through the Linear network: the style matrices and means are blended and decoded once, so the cost
+    does not grow with the number of styles beyond their (cached) style encodings
+    """
+    device = get_device()
+    content_img: Image.Image = open_rgb(content_file)
+
+    styles = [preset_style(style_path, device) for style_path in style_paths]
+    styles += [resolve_style(None, style_id, device) for style_id in style_ids]
+    styles += [encode_style(open_rgb(style_file), device)[1] for style_file in style_files]
+    style = StyleFeatures.blend(styles, weights)
+
+    model = get_linear_model(device)
+    return model.decode(encode_content(content_img, device), style)
+
+
+def stylize_video_file(
+    video_path: Path,
+    output_path: Path,
+    style_file: None | str = None,
+    style_path_str: None | str = None,
+    style_id: None | str = None,
+    quantized: bool | None = None,
+) -> VideoStats:
+    """
+    Stylizes a video clip into `output_path` (see `style_engine.video` and settings.VIDEO). The style side
+    runs once: presets load their Johnson model, other styles (and LINEAR_PRESETS presets) get their Linear
+    style features before the first frame.
+    """
+    device = get_device()
+    config = settings.VIDEO
+    preset = linear_preset(style_path_str, quantized)
+
+    if style_path_str and not preset:
+        model = get_johnson_model(Path(style_path_str).stem, device, quantized=use_quantized(quantized))
+        style = None
+    else:
+        style_img = open_rgb(style_file) if style_file else None
+        style = get_linear_presets(device)[preset] if preset else resolve_style(style_img, style_id, device)
+        model = get_linear_model(device)
+
+    return stylize_video(
+        model,
+        video_path,
+        output_path,
+        style,
+        width=config["WIDTH"],
+        batch_size=config["BATCH_SIZE"],
+        fourcc=config["FOURCC"],
+        max_frames=config.get("MAX_FRAMES"),
+    )
+
+
+def stylize_progressive(
+    content_file: str,
+    style_file: None | str = None,
+    style_path_str: None | str = None,
+    style_id: None | str = None,
+    quantized: bool | None = None,
+):
+    """
+    Yields ("preview", image) at PROGRESSIVE["PREVIEW_WIDTH"] as soon as possible, then ("final", image).
+    The content is decoded and resized once; the preview input is downscaled from the resized copy.
+    """
+    device = get_device()
+    preset = linear_preset(style_path_str, quantized)
+    if preset:
+        style_path_str = None
+    quantized = use_quantized(quantized)
+    preview_width = settings.PROGRESSIVE["PREVIEW_WIDTH"]
+
+    content_img: Image.Image = open_rgb(content_file)
+    style_img: Image.Image | None = open_rgb(style_file) if style_file else None
+
+    if style_path_str:
+        style_name = Path(style_path_str).stem
+        bank = None if quantized else get_style_bank_model(device)
+        if bank is None or style_name not in bank.style_index:
+            model = get_johnson_model(style_name, device, quantized=quantized)
+        else:
+            model = bank
+    else:
+        style = get_linear_presets(device)[preset] if preset else resolve_style(style_img, style_id, device)
+        model = get_linear_model(device)
+
+    resized = Image.fromarray(model.resize_img(content_img))
+    preview = resized.resize((preview_width, max(1, resized.height * preview_width // resized.width)), Image.BOX)
+
+    if style_path_str:
+        yield "preview", model.stylize(preview, style_name if model is bank else None, width=preview_width)
+        yield "final", stylize_johnson(resized, style_name, device, quantized)
+    else:
+        yield "preview", model.decode(model.encode_content(preview, preview_width), style)
+        yield "final", model.decode(encode_content(resized, device), style)
+
+
+def stylize_many(content_file, style_files=(), style_paths=()) -> list[tuple[str, Image.Image]]:
+    """
+    Stylizes one content image with several styles, returning (style name, image) pairs in input order.
+    The content is decoded and preprocessed once: Johnson presets share one input tensor (and one
+    mixed-style batch with the style bank), Linear uploads and Linear presets share one content encoding.
+    """
+    device = get_device()
+    content_img: Image.Image = open_rgb(content_file)
+
+    style_names = [Path(p).stem for p in style_paths]
+    presets = {name for name in style_names if linear_preset(name)}
+    johnson_names = [name for name in style_names if name not in presets]
+    outputs = dict(_stylize_johnson_many(content_img, johnson_names, device)) if johnson_names else dict()
+
+    if presets or style_files:
+        model = get_linear_model(device)
+        content = encode_content(content_img, device)
+        for name in presets:
+            outputs[name] = model.decode(content, get_linear_presets(device)[name])
+    results = [(name, outputs[name]) for name in style_names]
+
+    for style_file in style_files:
+        _, style = encode_style(open_rgb(style_file), device)
+        results.append((Path(style_file.name).stem, model.decode(content, style)))
+
+    return results
+
+
+def _stylize_johnson_many(content_img: Image.Image, style_names: list[str], device: str) -> list[tuple[str, Image.Image]]:
+    quantized = use_quantized()
+    bank = None if quantized else get_style_bank_model(device)
+    banked = [name for name in style_names if bank is not None and name in bank.style_index]
+    outputs = dict()
+
+    if banked:
+        input_tensor = bank.preprocess(content_img)
+        batch_size = settings.JOHNSON_BATCHING.get("MAX_BATCH_SIZE", 1)
+        for start in range(0, len(banked), batch_size):
+            names = banked[start : start + batch_size]
+            batch = input_tensor.expand(len(names), -1, -1, -1)
+            for name, output in zip(names, bank.forward(batch, bank.style_ids(names))):
+                outputs[name] = bank.postprocess(output)
+
+    input_tensor = None
+    for name in style_names:
+        if name in outputs:
+            continue
+        model = get_johnson_model(name, device, quantized=quantized)
+        if input_tensor is None:
+            input_tensor = model.preprocess(content_img)  # identical for every Johnson style
+        outputs[name] = model.postprocess(model.forward(input_tensor)[0])
+
+    return [(name, outputs[name]) for name in style_names]
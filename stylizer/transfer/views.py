@@ -1,10 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse, FileResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
 from pathlib import Path
+import asyncio
+import base64
 import io
-from .utils import stylize_image
+import json
+import logging
+import re
+import time
+import zipfile
+from PIL import Image
+from .utils import (
+    stylize_image,
+    stylize_blend,
+    stylize_many,
+    stylize_progressive,
+    inference_key,
+    inference_executor,
+    inference_pool,
+    open_rgb,
+    result_cache,
+    recent_results,
+    stylize_cache_key,
+    register_style,
+    model_registry,
+    johnson_batcher,
+    style_bank_batcher,
+    style_cache,
+    content_cache,
+    UnknownStyleError,
+)
+from style_engine.base import NEW_WIDTH
+from style_engine.ingest import timings as ingest_timings
+from . import encoding, jobs, warmup
+
+logger = logging.getLogger(__name__)
 
 
 def index(request):
@@ -34,27 +70,417 @@ def style_images(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+def _parse_stylize_form(request):
+    """
+    Reads and validates the /stylize/ form. Returns (options, None) or (None, error response).
+    """
+    content_file = request.FILES.get("content")
+    style_file = request.FILES.get("style")
+    style_path = request.POST.get("style_path")
+    style_id = request.POST.get("style_id")
+    width = request.POST.get("width")
+
+    if not content_file:
+        return None, HttpResponse("Missing content image", status=400)
+    if not style_file and not style_path and not style_id:
+        return None, HttpResponse("Missing style image, style path or style id", status=400)
+    if width and not (width.isdigit() and int(width) > 0):
+        return None, HttpResponse("Invalid width", status=400)
+    try:
+        output = encoding.negotiate(
+            request.POST.get("format"), request.POST.get("quality"), request.headers.get("Accept", "")
+        )
+    except ValueError as e:
+        return None, HttpResponse(str(e), status=400)
+
+    return {
+        "content_file": content_file,
+        "style_file": style_file,
+        "style_path": style_path,
+        "style_id": style_id,
+        "tiled": request.POST.get("tiled") in ("1", "true"),
+        "progressive": request.POST.get("progressive") in ("1", "true"),
+        # INT8 Johnson checkpoints: "1"/"0" picks per request, no field means QUANTIZED_INFERENCE
+        "quantized": {"1": True, "true": True, "0": False, "false": False}.get(request.POST.get("quantized")),
+        "width": int(width) if width else None,
+        "output": output,
+    }, None
+
+
+def _decode_inputs(options: dict) -> tuple:
+    """Decodes the uploads once; the pixels both address the result cache and feed inference"""
+    content_img = open_rgb(options["content_file"], options["width"] if options["tiled"] else NEW_WIDTH)
+    style_img = open_rgb(options["style_file"]) if options["style_file"] else None
+    return content_img, style_img, options["style_path"], options["style_id"]
+
+
+RESULT_KEY = re.compile(r"[0-9a-f]{64}")
+
+
+def _image_response(
+    data: bytes, output: encoding.OutputFormat, cache_key: str | None, result_key: str | None = None
+) -> HttpResponse:
+    response = HttpResponse(data, content_type=output.content_type)
+    response["Vary"] = "Accept"
+    if cache_key:
+        response["ETag"] = quote_etag(cache_key)
+        response["Cache-Control"] = "private, no-cache"  # browsers may keep it but must revalidate
+    if result_key:
+        response["X-Result-Key"] = result_key  # lossless download: /stylize/result/<key>/
+    return response
+
+
 @csrf_exempt
-def stylize(request):
+async def stylize(request):
     """
-    Takes in request and calls stylize_image to perform stylization
+    Takes in request and calls stylize_image to perform stylization.
+    Upload parsing runs in worker threads, inference on the bounded inference executor and encoding
+    (format negotiated from `format`/`quality` or the Accept header) on the encoding pool, so the event
+    loop stays free while images are being processed.
+    Results are served from the result cache when the same inputs were stylized before; the cache key
+    doubles as a strong ETag, so a matching If-None-Match gets a 304.
     """
-    if request.method == "POST":
-        content_file = request.FILES.get("content")
-        style_file = request.FILES.get("style")
-        style_path = request.POST.get("style_path")
+    if request.method != "POST":
+        return HttpResponse("Invalid request", status=405)
+
+    options, error = await sync_to_async(_parse_stylize_form, thread_sensitive=False)(request)
+    if error:
+        return error
+
+    key = await sync_to_async(inference_key, thread_sensitive=False)(options["style_path"], options["quantized"])
+    inputs = await sync_to_async(_decode_inputs, thread_sensitive=False)(options)
+    progressive = options["progressive"] and not options["tiled"]
+    output = options["output"]
+
+    # The result key addresses the result cache and the lossless download of this result
+    base_key = await sync_to_async(stylize_cache_key, thread_sensitive=False)(
+        *inputs, tiled=options["tiled"], width=options["width"], quantized=options["quantized"]
+    )
+    cache_key, cached = None, None
+    if result_cache is not None:
+        cache_key = base_key + output.cache_suffix
+        if not progressive and quote_etag(cache_key) in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponse(status=304)
+            response["ETag"] = quote_etag(cache_key)
+            response["Vary"] = "Accept"
+            return response
+        cached = await sync_to_async(result_cache.get, thread_sensitive=False)(cache_key)
 
-        if not content_file:
-            return HttpResponse("Missing content image", status=400)
-        if not style_file and not style_path:
-            return HttpResponse("Missing style image or style path", status=400)
+    if progressive:
+        return _stylize_event_stream(request, key, inputs, output, base_key, cached, options["quantized"])
+    if cached is not None:
+        return _image_response(cached, output, cache_key, base_key)
 
-        result_img = stylize_image(content_file, style_file, style_path)
+    try:
+        result_img = await inference_executor.run(
+            key, stylize_image, *inputs, tiled=options["tiled"], width=options["width"], quantized=options["quantized"]
+        )
+    except UnknownStyleError:
+        return HttpResponse("Unknown or expired style id, upload the style image again", status=404)
+
+    recent_results.put(base_key, result_img)
+    data = await encoding.encode_async(result_img, output)
+    if result_cache is not None:
+        await sync_to_async(result_cache.put, thread_sensitive=False)(cache_key, data)
+    return _image_response(data, output, cache_key, base_key)
+
+
+async def stylize_result(request, result_key):
+    """
+    Lossless (PNG) download of a /stylize/ result, by the key its response carried (`X-Result-Key` header
+    or the final event's `result_key`). The PNG comes from the result cache, or is encoded on this first
+    download from the pixels kept in memory; the model never runs again.
+    """
+    if not RESULT_KEY.fullmatch(result_key):
+        return HttpResponse("Invalid result key", status=400)
 
-        buf = io.BytesIO()
-        result_img.save(buf, format="PNG")
-        buf.seek(0)
-        return FileResponse(buf, content_type="image/png")
+    png = encoding.OutputFormat("png", encoding.default_quality("png"))
+    cache_key = result_key + png.cache_suffix
+    data = None
+    if result_cache is not None:
+        data = await sync_to_async(result_cache.get, thread_sensitive=False)(cache_key)
+    if data is None:
+        result_img = recent_results.get(result_key)
+        if result_img is None:
+            return HttpResponse("Unknown or expired result, stylize the image again", status=404)
+        data = await encoding.encode_async(result_img, png)
+        if result_cache is not None:
+            await sync_to_async(result_cache.put, thread_sensitive=False)(cache_key, data)
+
+    response = _image_response(data, png, cache_key)
+    response["Content-Disposition"] = 'attachment; filename="stylized_image.png"'
+    return response
+
+
+def _stylize_event_stream(request, key, inputs, output, base_key=None, cached=None, quantized=None):
+    """
+    Streams a low-resolution preview followed by the full result as Server-Sent Events.
+    Each event carries {"stage", "width", "height", "image"} where image is a data URL in the negotiated format;
+    the final event adds "result_key" for the lossless download (/stylize/result/<key>/).
+    A cached result is sent straight away as the only ("final") event; a fresh final result is cached.
+    """
+
+    def image_event(stage, data):
+        width, height = Image.open(io.BytesIO(data)).size  # reads the header only
+        payload = {
+            "stage": stage,
+            "width": width,
+            "height": height,
+            "image": f"data:{output.content_type};base64," + base64.b64encode(data).decode(),
+        }
+        if stage == "final":
+            payload["result_key"] = base_key
+        return f"event: {stage}\ndata: {json.dumps(payload)}\n\n"
+
+    def stages():
+        if cached is not None:
+            yield "final", cached
+        else:
+            yield from stylize_progressive(*inputs, quantized=quantized)
+
+    def store(stage, result, data):
+        if stage != "final":
+            return
+        recent_results.put(base_key, result)
+        if result_cache is not None:
+            result_cache.put(base_key + output.cache_suffix, data)
+
+    error_event = "event: error\ndata: {\"error\": \"Unknown or expired style id\"}\n\n"
+
+    async def async_events():
+        source = stages()
+        try:
+            while (item := await inference_executor.run(key, next, source, None)) is not None:
+                stage, result = item
+                if isinstance(result, bytes):
+                    yield image_event(stage, result)
+                    continue
+                data = await encoding.encode_async(result, output)
+                await sync_to_async(store, thread_sensitive=False)(stage, result, data)
+                yield image_event(stage, data)
+        except UnknownStyleError:
+            yield error_event
+
+    def sync_events():
+        try:
+            for stage, result in stages():
+                if isinstance(result, bytes):
+                    yield image_event(stage, result)
+                    continue
+                data = encoding.encode_executor.submit(encoding.encode, result, output).result()
+                store(stage, result, data)
+                yield image_event(stage, data)
+        except UnknownStyleError:
+            yield error_event
+
+    # ASGI servers stream async iterators natively, WSGI servers need a plain iterator
+    events = async_events() if isinstance(request, ASGIRequest) else sync_events()
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the preview
+    return response
+
+
+@csrf_exempt
+def job_create(request):
+    """
+    Enqueues a stylization job (same fields as /stylize/) and returns its id straight away
+    """
+    if request.method != "POST":
+        return HttpResponse("Invalid request", status=405)
+
+    options, error = _parse_stylize_form(request)
+    if error:
+        return error
+
+    files = {"content": options["content_file"]}
+    if options["style_file"]:
+        files["style"] = options["style_file"]
+    payload = {
+        "style_path": options["style_path"],
+        "style_id": options["style_id"],
+        "tiled": options["tiled"],
+        "width": options["width"],
+        "quantized": options["quantized"],
+    }
+    job = jobs.submit("stylize", files, payload)
+
+    response = job.as_dict()
+    response["status_url"] = reverse("job_status", args=[job.id])
+    response["result_url"] = reverse("job_result", args=[job.id])
+    return JsonResponse(response, status=202)
+
+
+@csrf_exempt
+def video_job_create(request):
+    """
+    Enqueues a video stylization job: a `video` clip plus the style fields of /stylize/ (`style`,
+    `style_path` or `style_id`, and `quantized`). The result is an MP4.
+    """
+    if request.method != "POST":
+        return HttpResponse("Invalid request", status=405)
+
+    video_file = request.FILES.get("video")
+    style_file = request.FILES.get("style")
+    style_path = request.POST.get("style_path")
+    style_id = request.POST.get("style_id")
+    if not video_file:
+        return HttpResponse("Missing video", status=400)
+    if not style_file and not style_path and not style_id:
+        return HttpResponse("Missing style image, style path or style id", status=400)
+
+    files = {"video": video_file}
+    if style_file:
+        files["style"] = style_file
+    payload = {
+        "style_path": style_path,
+        "style_id": style_id,
+        "quantized": {"1": True, "true": True, "0": False, "false": False}.get(request.POST.get("quantized")),
+    }
+    job = jobs.submit("video", files, payload)
+
+    response = job.as_dict()
+    response["status_url"] = reverse("job_status", args=[job.id])
+    response["result_url"] = reverse("job_result", args=[job.id])
+    return JsonResponse(response, status=202)
+
+
+async def job_status(request, job_id):
+    """
+    Returns the job status. With ?wait=N (seconds, max 30) the request is held until the job finishes;
+    the view is async so a held request does not tie up a thread.
+    """
+    pool = await sync_to_async(jobs.get_pool, thread_sensitive=False)()
+    get_job = sync_to_async(pool.queue.get, thread_sensitive=False)
+    job = await get_job(job_id)
+    if job is None:
+        return JsonResponse({"error": "Unknown job"}, status=404)
+
+    try:
+        wait = min(max(float(request.GET.get("wait", 0)), 0), 30)
+    except ValueError:
+        wait = 0
+    deadline = time.monotonic() + wait
+    while not job.finished and time.monotonic() < deadline:
+        await asyncio.sleep(0.25)
+        job = await get_job(job_id)
+
+    response = job.as_dict()
+    stats_path = pool.job_dir(job_id) / "stats.json"
+    if job.status == jobs.DONE and stats_path.exists():
+        # video jobs: frames and frames per second
+        response["stats"] = json.loads(await sync_to_async(stats_path.read_text, thread_sensitive=False)())
+    return JsonResponse(response)
+
+
+def job_result(request, job_id):
+    """
+    Returns the result of a finished job (PNG image, MP4 for video jobs)
+    """
+    job = jobs.get_pool().queue.get(job_id)
+    if job is None:
+        return HttpResponse("Unknown job", status=404)
+    if job.status == jobs.FAILED:
+        return HttpResponse(f"Job failed: {job.error}", status=500)
+    if job.status != jobs.DONE:
+        return HttpResponse("Job not finished yet", status=409)
+
+    content_type = "video/mp4" if job.kind == "video" else "image/png"
+    return FileResponse(open(job.result, "rb"), content_type=content_type)
+
+
+def _parse_style_lists(request):
+    """Reads the repeatable style fields shared by /stylize/multi/ and /stylize/blend/"""
+    return (
+        request.FILES.get("content"),
+        request.FILES.getlist("style"),
+        request.POST.getlist("style_path"),
+        request.POST.getlist("style_id"),
+    )
+
+
+def _zip_results(results: list[tuple[str, Image.Image]]) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as archive:  # PNGs are already compressed
+        for index, (name, result_img) in enumerate(results):
+            img_buf = io.BytesIO()
+            result_img.save(img_buf, format="PNG")
+            archive.writestr(f"{index:02d}_{name}.png", img_buf.getvalue())
+    buf.seek(0)
+    return buf
+
+
+@csrf_exempt
+async def stylize_multi(request):
+    """
+    Stylizes one content image with every given style (`style_path` and/or `style`, both repeatable)
+    and returns the results as a zip of PNGs.
+    The request may use several models, so it runs on the executor under its own "multi" key: at most
+    PER_MODEL_LIMIT of them at a time, without holding up single-style requests.
+    """
+    if request.method != "POST":
+        return HttpResponse("Invalid request", status=405)
+
+    content_file, style_files, style_paths, _ = await sync_to_async(_parse_style_lists, thread_sensitive=False)(request)
+    if not content_file:
+        return HttpResponse("Missing content image", status=400)
+    if not style_files and not style_paths:
+        return HttpResponse("Missing style images or style paths", status=400)
+
+    results = await inference_executor.run(("multi",), stylize_many, content_file, style_files, style_paths)
+    buf = await sync_to_async(_zip_results, thread_sensitive=False)(results)
+    return FileResponse(buf, content_type="application/zip", as_attachment=True, filename="stylized_images.zip")
+
+
+@csrf_exempt
+async def blend(request):
+    """
+    Stylizes one content image with a weighted mix of styles (`style_path`, `style_id` and `style`, all
+    repeatable) in a single Linear pass. `weight` (repeatable) gives one weight per style, in the order
+    style paths, style ids, uploads; without it the styles are mixed equally.
+    Runs on the inference executor under the Linear model's key, like /stylize/.
+    """
+    if request.method != "POST":
+        return HttpResponse("Invalid request", status=405)
+
+    content_file, style_files, style_paths, style_ids = await sync_to_async(
+        _parse_style_lists, thread_sensitive=False
+    )(request)
+    if not content_file:
+        return HttpResponse("Missing content image", status=400)
+    if not style_files and not style_paths and not style_ids:
+        return HttpResponse("Missing style images, style paths or style ids", status=400)
+    try:
+        weights = [float(w) for w in request.POST.getlist("weight")] or None
+        output = encoding.negotiate(
+            request.POST.get("format"), request.POST.get("quality"), request.headers.get("Accept", "")
+        )
+    except ValueError as e:
+        return HttpResponse(f"Invalid weight or output format: {e}", status=400)
+
+    try:
+        result_img = await inference_executor.run(
+            inference_key(), stylize_blend, content_file, style_files, style_paths, style_ids, weights
+        )
+    except UnknownStyleError as e:
+        return HttpResponse(str(e), status=404)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    data = await encoding.encode_async(result_img, output)
+    return _image_response(data, output, None)
+
+
+@csrf_exempt
+def styles(request):
+    """
+    Encodes an uploaded style image once and returns a style id usable as `style_id` in /stylize/
+    """
+    if request.method == "POST":
+        style_file = request.FILES.get("style")
+        if not style_file:
+            return HttpResponse("Missing style image", status=400)
+
+        return JsonResponse({"style_id": register_style(style_file)})
 
     return HttpResponse("Invalid request", status=405)
 
@@ -71,3 +497,26 @@ def gallery_images(request):
         return JsonResponse(image_files, safe=False)
     except FileNotFoundError:
         return JsonResponse([], safe=False)
+
+
+def metrics(request):
+    """Return in-process counters for the model registry, micro-batchers and feature caches"""
+    return JsonResponse(
+        {
+            "model_registry": model_registry.stats(),
+            "johnson_batching": johnson_batcher.stats(),
+            "style_bank_batching": style_bank_batcher.stats(),
+            "style_feature_cache": style_cache.stats(),
+            "content_feature_cache": content_cache.stats(),
+            "inference_executor": inference_executor.stats(),
+            "inference_pool": inference_pool.stats() if inference_pool else None,
+            "result_cache": result_cache.stats() if result_cache else None,
+            "recent_results": recent_results.stats(),
+            "ingest": ingest_timings.stats(),
+        }
+    )
+
+
+def healthz(request):
+    """Readiness probe: 200 once models are warmed up, 503 while warming or after a failed warm-up"""
+    return JsonResponse(warmup.status, status=200 if warmup.ready.is_set() else 503)
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .process import is_server_process
+from .utils import get_device, get_johnson_model, get_linear_model, get_linear_presets, inference_pool, use_quantized
+
+logger = logging.getLogger(__name__)
+
+# Readiness shared with the health endpoint: "pending" -> "warming" -> "ready" | "failed"
+status = {"state": "pending", "error": None, "seconds": None}
+ready = threading.Event()
+
+
+def should_warm_up() -> bool:
+    """
+    Warm-up only runs in processes that serve traffic (not migrate, shell, the autoreloader parent, ...)
+    """
+    return bool(settings.WARMUP.get("ENABLED")) and is_server_process()
+
+
+def warm_up_pool():
+    """
+    Runs the dummy stylizations on every INFERENCE_POOL worker: one task per worker at a time, which
+    least-loaded routing spreads over all of them, so each worker loads its models and warms its kernels
+    """
+    tasks = [{"kind": "linear"}] + [{"kind": "johnson", "style_name": s} for s in settings.WARMUP["JOHNSON_STYLES"]]
+    timeout = settings.INFERENCE_POOL.get("TIMEOUT")
+    for width, height in settings.WARMUP["RESOLUTIONS"]:
+        dummy = np.full((height, width, 3), 127, dtype=np.uint8)
+        for task in tasks:
+            arrays = {"content": dummy, "style": dummy} if task["kind"] == "linear" else {"content": dummy}
+            futures = [inference_pool.submit(task, arrays) for _ in range(inference_pool.workers)]
+            for future in futures:
+                future.result(timeout)
+
+
+def warm_up():
+    """
+    Loads the Linear backend (and its preset features when LINEAR_PRESETS is enabled) and the configured
+    Johnson styles into the model registry, then runs a dummy stylization at each configured resolution
+    so the allocator and kernels are warm. With INFERENCE_POOL the pool workers are warmed instead and
+    only the models still served by this process (INT8 presets) are loaded here.
+    """
+    status["state"] = "warming"
+    start = time.perf_counter()
+    try:
+        device = get_device()
+        get_linear_presets(device)
+        styles = settings.WARMUP["JOHNSON_STYLES"]
+        if inference_pool is not None:
+            warm_up_pool()
+            models = [get_johnson_model(style, device, quantized=True) for style in styles] if use_quantized() else []
+        else:
+            models = [get_linear_model(device)]
+            models += [get_johnson_model(style, device, quantized=use_quantized()) for style in styles]
+
+        for width, height in settings.WARMUP["RESOLUTIONS"]:
+            dummy = Image.new("RGB", (width, height), (127, 127, 127))
+            for model in models:
+                model.stylize(dummy, dummy)
+    except Exception as e:
+        logger.exception("Model warm-up failed")
+        status.update(state="failed", error=str(e))
+        return
+
+    status.update(state="ready", seconds=round(time.perf_counter() - start, 3))
+    ready.set()
+    logger.info("Model warm-up finished in %.1fs", status["seconds"])
+
+
+def start():
+    """
+    Starts warm-up in a background thread, or marks the process ready straight away if disabled
+    """
+    if not should_warm_up():
+        status["state"] = "ready"
+        ready.set()
+        return
+    threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()